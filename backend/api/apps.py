@@ -1,6 +1,42 @@
+import logging
+import os
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from feature_extraction.cache import feature_cache
+        from prediction.registry import model_registry
+        from .feature_store import FeatureSetStore
+        # Features of signals already stored in a FeatureSet are read back instead of recomputed
+        feature_cache.persistent = FeatureSetStore()
+        if getattr(settings, 'MODEL_ARTIFACTS', 'pickle') == 'compiled':
+            from config import COMPILED_MODEL_PATHS
+            missing = [path for path in COMPILED_MODEL_PATHS.values() if not os.path.exists(path)]
+            if missing:
+                # Serving the pickles beats failing every prediction with FileNotFoundError
+                logger.warning(
+                    "MODEL_ARTIFACTS=compiled but %s not found; serving the pickled models. "
+                    "Run `manage.py export_models` to create them.", ", ".join(missing)
+                )
+            else:
+                model_registry.use_paths(COMPILED_MODEL_PATHS)
+        if not getattr(settings, 'PRELOAD_MODELS', False):
+            return
+        from prediction.compiled import compiled_model
+        try:
+            model_registry.preload()
+            # Compile the NumPy engines now too, so under `gunicorn --preload`
+            # the forked workers share them instead of each building a copy
+            for muscle_group in model_registry:
+                compiled_model(model_registry[muscle_group])
+            logger.info("Preloaded prediction models: %s", ", ".join(model_registry.keys()))
+        except Exception as e:
+            # Models are still loaded lazily on first prediction
+            logger.warning("Could not preload prediction models: %s", e)
@@ -0,0 +1,107 @@
+import zlib
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from feature_extraction.cache import signal_key
+
+from .models import EMGChunk, EMGData
+
+# Integer ADC samples keep their width and are delta encoded (differences wrap
+# in the same dtype, so the cumulative sum restores them exactly). float64
+# samples, e.g. JSON uploads, stay float64 so features recomputed from the
+# chunks match the ones streamed at upload time; everything else is float32.
+DELTA_DTYPES = ('int16', 'int32')
+
+
+def _compress(raw):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=3).compress(raw)
+    return 'zlib', zlib.compress(raw, 6)
+
+
+def _decompress(codec, payload):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if codec == 'zlib':
+        return zlib.decompress(payload)
+    raise ValueError(f"Unknown EMG chunk codec '{codec}'")
+
+
+def encode_samples(samples):
+    """Encode a 1-D sample array into EMGChunk field values."""
+    samples = np.asarray(samples).ravel()
+    if samples.dtype.name in DELTA_DTYPES:
+        values = samples.astype(samples.dtype.newbyteorder('<'), copy=False)
+        deltas = np.empty_like(values)
+        deltas[:1] = values[:1]
+        np.subtract(values[1:], values[:-1], out=deltas[1:])
+        codec, payload = _compress(deltas.tobytes())
+        return {
+            'dtype': samples.dtype.name,
+            'encoding': f'delta+{codec}',
+            'n_samples': samples.size,
+            'data': payload,
+        }
+    dtype = 'float64' if samples.dtype == np.float64 else 'float32'
+    codec, payload = _compress(samples.astype(np.dtype(dtype).newbyteorder('<')).tobytes())
+    return {
+        'dtype': dtype,
+        'encoding': codec,
+        'n_samples': samples.size,
+        'data': payload,
+    }
+
+
+def decode_chunk(chunk):
+    """Decode an EMGChunk back into its samples."""
+    delta, _, codec = chunk.encoding.rpartition('+')
+    dtype = np.dtype(chunk.dtype).newbyteorder('<')
+    values = np.frombuffer(_decompress(codec, bytes(chunk.data)), dtype=dtype, count=chunk.n_samples)
+    if delta:
+        values = np.cumsum(values, dtype=dtype)
+    return values
+
+
+def _assemble(chunks):
+    return np.concatenate([decode_chunk(chunk) for chunk in chunks]).astype(float, copy=False)
+
+
+def read_session_signal(session):
+    """Return a session's full signal as one float64 array, or None if it has no data.
+
+    Sessions recorded before chunked storage fall back to the latest
+    EMGData.raw_data list.
+    """
+    chunks = list(EMGChunk.objects.filter(session=session).order_by('sequence'))
+    if chunks:
+        return _assemble(chunks)
+    emg_obj = EMGData.objects.filter(session=session).last()
+    if emg_obj is None or not emg_obj.raw_data:
+        return None
+    return np.asarray(emg_obj.raw_data, dtype=float)
+
+
+def session_signal_key(session, fs):
+    """``signal_key`` of a session's stored signal, or "" if it has no samples."""
+    emg_signal = read_session_signal(session)
+    return signal_key(emg_signal, fs) if emg_signal is not None else ""
+
+
+def read_session_signals(session_ids):
+    """Bulk version of read_session_signal: {session_id: signal} in two queries."""
+    by_session = {}
+    for chunk in EMGChunk.objects.filter(session_id__in=session_ids).order_by('session_id', 'sequence'):
+        by_session.setdefault(chunk.session_id, []).append(chunk)
+    signals = {session_id: _assemble(chunks) for session_id, chunks in by_session.items()}
+    legacy_ids = [session_id for session_id in session_ids if session_id not in signals]
+    if legacy_ids:
+        for emg_obj in EMGData.objects.filter(session_id__in=legacy_ids).order_by('id'):
+            if emg_obj.raw_data:
+                signals[emg_obj.session_id] = np.asarray(emg_obj.raw_data, dtype=float)
+    return signals
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+# session_id -> set of (event loop, asyncio.Event) for every open status stream
+_watchers = {}
+_lock = threading.Lock()
+
+
+def notify_session(session_id):
+    """Wake every status stream watching this session.
+
+    Safe to call from any thread, e.g. the prediction worker pool. Streams
+    served by other processes are not reached and fall back to polling.
+    """
+    with _lock:
+        watchers = list(_watchers.get(int(session_id), ()))
+    for loop, event in watchers:
+        loop.call_soon_threadsafe(event.set)
+
+
+class SessionWatch:
+    """Async context manager that waits for notify_session calls for one session."""
+
+    def __init__(self, session_id):
+        self.session_id = int(session_id)
+        self._event = asyncio.Event()
+        self._key = None
+
+    async def __aenter__(self):
+        self._key = (asyncio.get_running_loop(), self._event)
+        with _lock:
+            _watchers.setdefault(self.session_id, set()).add(self._key)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        with _lock:
+            watchers = _watchers.get(self.session_id)
+            if watchers is not None:
+                watchers.discard(self._key)
+                if not watchers:
+                    del _watchers[self.session_id]
+
+    async def wait(self, timeout):
+        """Return True if notified within ``timeout`` seconds, False otherwise."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
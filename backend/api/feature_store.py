@@ -0,0 +1,34 @@
+import logging
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import DatabaseError
+
+from .models import FeatureSet
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureSetStore:
+    """Persistent tier of feature_extraction.cache: features of earlier FeatureSets with the same signal_hash."""
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Features for each key that has a stored FeatureSet, in one query. Returns ``{key: features}``."""
+        keys = set(keys)
+        if not keys:
+            return {}
+        try:
+            rows = list(
+                FeatureSet.objects.filter(signal_hash__in=keys).order_by('id').values_list('signal_hash', 'features')
+            )
+        except (DatabaseError, SynchronousOnlyOperation) as e:
+            # Without the database the cache just falls back to computing
+            logger.warning("Feature store lookup failed: %s", e)
+            return {}
+        found = {}
+        # Ordered by id, so the newest FeatureSet per key wins
+        for key, payload in rows:
+            if payload and isinstance(payload.get('emg'), dict):
+                found[key] = payload['emg']
+        return found
@@ -0,0 +1,242 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from prediction.predictor import InjuryRiskPredictor
+from config import FILTER_HIGH_CUTOFF, FILTER_LOW_CUTOFF, FILTER_ORDER, FILTER_ZERO_PHASE, NOTCH_FREQ
+from feature_extraction.cache import feature_cache
+from feature_extraction.streaming import StreamingFeatureExtractor
+from metrics import stage
+
+from .models import UserProfile, Session, EMGData, FeatureSet, RiskScore, PredictionJob
+from .emg_storage import read_session_signal, session_signal_key
+from .events import notify_session
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def build_user_inputs(user):
+    return {
+        "age": user.age,
+        "height": user.height,
+        "weight": user.weight,
+        "bmi": user.weight / ((user.height / 100) ** 2),
+        "training_frequency": user.training_frequency,
+        "previous_injury": user.previous_injury,
+        "contraction_type": user.contraction_type,
+    }
+
+
+def refresh_latest_risk(user_ids):
+    """Copy each user's newest RiskScore onto UserProfile.latest_risk_* in one UPDATE.
+
+    "Newest" follows the recording, not the score: a rescore of an old
+    recording does not replace the risk of a newer one.
+    """
+    latest = RiskScore.objects.filter(feature_set__emg_data__user=OuterRef('pk')).order_by(
+        '-feature_set__emg_data__timestamp', '-feature_set__timestamp', '-feature_set_id', '-timestamp', '-id'
+    )
+    UserProfile.objects.filter(id__in=user_ids).update(
+        latest_risk_level=Subquery(latest.values('level')[:1]),
+        latest_risk_score=Subquery(latest.values('score')[:1]),
+        latest_risk_at=Subquery(latest.values('timestamp')[:1]),
+    )
+
+
+def feature_set_payload(user_inputs, emg_features, muscle_group, fs):
+    """JSON stored in FeatureSet.features; enough to rescore without the raw signal."""
+    return {
+        "muscle_group": muscle_group,
+        "fs": fs,
+        "user_inputs": user_inputs,
+        "emg": {name: value.item() if hasattr(value, "item") else value for name, value in emg_features.items()},
+    }
+
+
+def _matches_offline_extraction(extractor):
+    """Whether streamed features equal what ``extract_features`` gives for the whole signal."""
+    return not FILTER_ZERO_PHASE and (
+        extractor.lowcut, extractor.highcut, extractor.notch_freq, extractor.order
+    ) == (FILTER_LOW_CUTOFF, FILTER_HIGH_CUTOFF, NOTCH_FREQ, FILTER_ORDER)
+
+
+def run_session_prediction(session, fs=1000):
+    """Score a session's EMG data and store the result. Returns the risk level."""
+    with stage("db_fetch"):
+        emg_obj = EMGData.objects.filter(session=session).last()
+        user = session.user
+    if not emg_obj:
+        raise ValueError(f"No EMG data found for session: {session.id}")
+
+    user_inputs = build_user_inputs(user)
+    muscle_group = user.muscle_group
+
+    extractor = None
+    signal_hash = ""
+    if session.feature_state:
+        try:
+            extractor = StreamingFeatureExtractor.from_state(session.feature_state)
+        except (KeyError, ValueError):
+            logger.warning("Ignoring incompatible streaming state for session %s", session.id)
+    if extractor is not None:
+        # Chunks were filtered as they arrived; only the accumulators are left to finalize
+        with stage("features"):
+            features = extractor.finalize()
+        fs = extractor.fs
+        if _matches_offline_extraction(extractor):
+            # Key the FeatureSet by the stored signal as well, so rescoring or
+            # re-uploading a streamed recording hits the persistent feature tier
+            with stage("feature_cache"):
+                signal_hash = session_signal_key(session, fs)
+            if signal_hash:
+                feature_cache.put(signal_hash, features)
+    else:
+        with stage("decode"):
+            emg_signal = read_session_signal(session)
+        if emg_signal is None:
+            raise ValueError(f"No EMG samples found for session: {session.id}")
+        # Re-running end_session or re-uploading a recording skips the DSP
+        features, signal_hash = feature_cache.features(emg_signal, fs)
+
+    predictor = InjuryRiskPredictor()
+    risk_level, score = predictor.score_from_features(user_inputs, features, muscle_group)
+
+    with stage("save"), transaction.atomic():
+        feature_set = FeatureSet.objects.create(
+            emg_data=emg_obj,
+            features=feature_set_payload(user_inputs, features, muscle_group, fs),
+            signal_hash=signal_hash,
+        )
+        RiskScore.objects.create(
+            feature_set=feature_set,
+            score=score,
+            level=risk_level,
+            model_version=predictor.model_version(muscle_group),
+        )
+
+        # Save risk_level to EMGData
+        emg_obj.risk_level = risk_level
+        emg_obj.save(update_fields=["risk_level"])
+        refresh_latest_risk([user.id])
+
+        session.status = "completed"
+        session.save(update_fields=["status"])
+    return risk_level
+
+
+def _claimable():
+    # Queued jobs, plus running jobs whose worker died before finishing them
+    stale = timezone.now() - timedelta(seconds=getattr(settings, "PREDICTION_JOB_TIMEOUT", 600))
+    return Q(status="queued") | Q(status="running", started_at__lt=stale)
+
+
+def _claim(job_id):
+    # Conditional update so two workers can never run the same job
+    return PredictionJob.objects.filter(_claimable(), id=job_id).update(
+        status="running", started_at=timezone.now(), attempts=F("attempts") + 1
+    ) == 1
+
+
+def claim_next_job():
+    """Mark the oldest claimable job as running and return it, or None if there is none.
+
+    Jobs still running after PREDICTION_JOB_TIMEOUT seconds are assumed to
+    belong to a crashed worker and are claimed again.
+    """
+    claimable = PredictionJob.objects.filter(_claimable()).order_by("created_at", "id")
+    for job_id in claimable.values_list("id", flat=True)[:10]:
+        if _claim(job_id):
+            return PredictionJob.objects.select_related("session__user").get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome on the job and its session."""
+    session = job.session
+    try:
+        risk_level = run_session_prediction(session, fs=job.fs)
+        job.status = "done"
+        logger.info("Session %s processed with risk level: %s", session.id, risk_level)
+    except Exception as e:
+        logger.exception("Error in prediction pipeline for session %s", session.id)
+        job.status = "failed"
+        job.error = str(e)
+        session.status = "failed"
+        session.save(update_fields=["status"])
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    notify_session(session.id)
+    return job
+
+
+def process_job(job_id):
+    try:
+        if _claim(job_id):
+            run_job(PredictionJob.objects.select_related("session__user").get(id=job_id))
+    except Exception:
+        logger.exception("Prediction job %s crashed", job_id)
+    finally:
+        close_old_connections()
+
+
+def drain_jobs():
+    """Run claimable jobs until there are none left."""
+    try:
+        while True:
+            job = claim_next_job()
+            if job is None:
+                break
+            run_job(job)
+    except Exception:
+        logger.exception("Draining prediction jobs crashed")
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "PREDICTION_WORKER_THREADS", 2),
+                thread_name_prefix="prediction",
+            )
+            # Pick up jobs queued before a restart, or left running by a dead process
+            _executor.submit(drain_jobs)
+        return _executor
+
+
+def resume_jobs():
+    """Start the thread pool so jobs left over from a previous process run again.
+
+    A no-op unless PREDICTION_WORKER = "thread"; gunicorn calls it in each
+    worker after forking.
+    """
+    if getattr(settings, "PREDICTION_WORKER", "thread") == "thread":
+        _get_executor()
+
+
+def enqueue_prediction(session, fs=1000):
+    """Queue a prediction job for the session, or return the one already queued or running.
+
+    With PREDICTION_WORKER = "thread" the job runs on this process's thread
+    pool once the transaction commits; with "external" it waits for
+    ``manage.py run_prediction_worker``.
+    """
+    with transaction.atomic():
+        # Lock the session so concurrent end_session calls can't both create a job
+        Session.objects.select_for_update().filter(id=session.id).first()
+        job = PredictionJob.objects.filter(session=session, status__in=("queued", "running")).order_by("-id").first()
+        if job is not None:
+            return job
+        job = PredictionJob.objects.create(session=session, fs=fs)
+        if getattr(settings, "PREDICTION_WORKER", "thread") == "thread":
+            transaction.on_commit(lambda: _get_executor().submit(process_job, job.id))
+    return job
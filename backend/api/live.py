@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from prediction.predictor import InjuryRiskPredictor
+from feature_extraction.streaming import SlidingWindowScorer
+
+from .models import Session
+from .jobs import build_user_inputs
+
+logger = logging.getLogger(__name__)
+
+LIVE_RISK_PATH = '/ws/live_risk/'
+
+# session_id -> set of viewer send callables (coach dashboards)
+_viewers = {}
+
+
+def _load_session(session_id):
+    session = Session.objects.select_related('user').filter(id=session_id).first()
+    if session is None:
+        return None
+    return build_user_inputs(session.user), session.user.muscle_group
+
+
+async def _broadcast(session_id, message, device_send=None):
+    text = json.dumps(message)
+    targets = list(_viewers.get(session_id, ()))
+    if device_send is not None:
+        targets.append(device_send)
+    for send in targets:
+        try:
+            await send({'type': 'websocket.send', 'text': text})
+        except Exception:
+            # A viewer that went away is removed by its own handler
+            pass
+
+
+def _decode_samples(event):
+    samples = _parse_samples(event)
+    # One NaN or inf would poison the filter state for the rest of the stream
+    if not np.isfinite(samples).all():
+        raise ValueError("Samples must be finite numbers")
+    return samples
+
+
+def _parse_samples(event):
+    if event.get('bytes') is not None:
+        return np.frombuffer(event['bytes'], dtype='<f4')
+    data = json.loads(event.get('text') or '{}')
+    if not isinstance(data, dict):
+        raise ValueError('Text frames must be a JSON object with a "samples" list')
+    try:
+        return np.asarray(data.get('samples', []), dtype=float)
+    except TypeError:
+        raise ValueError('"samples" must be a list of numbers')
+
+
+async def live_risk_websocket(scope, receive, send):
+    """ASGI WebSocket endpoint for rolling risk estimates during a drill.
+
+    Connect to ``/ws/live_risk/?session_id=<id>[&fs=1000]``. The device
+    (``role=device``, the default) sends little-endian float32 binary frames
+    or ``{"samples": [...]}`` text frames. Every hop the server scores the
+    last window of filtered samples and sends
+    ``{"type": "risk", "risk_level", "score", "t"}`` to the device and to all
+    ``role=viewer`` connections for the same session.
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    params = parse_qs(scope.get('query_string', b'').decode())
+    session_id = params.get('session_id', [''])[0]
+    role = params.get('role', ['device'])[0]
+    if scope['path'].rstrip('/') + '/' != LIVE_RISK_PATH or not session_id.isdigit() or role not in ('device', 'viewer'):
+        await send({'type': 'websocket.close', 'code': 4400})
+        return
+    try:
+        fs = float(params.get('fs', ['1000'])[0])
+        if not np.isfinite(fs) or fs <= 0:
+            raise ValueError(f"Invalid sample rate {fs}")
+        # The filter chain rejects rates too low for its band (below ~900 Hz)
+        scorer = SlidingWindowScorer(
+            fs,
+            window_seconds=settings.LIVE_RISK_WINDOW_SECONDS,
+            hop_seconds=settings.LIVE_RISK_HOP_SECONDS,
+        ) if role == 'device' else None
+    except ValueError:
+        await send({'type': 'websocket.close', 'code': 4400})
+        return
+    session_id = int(session_id)
+    loaded = await sync_to_async(_load_session)(session_id)
+    if loaded is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    await send({'type': 'websocket.accept'})
+
+    if role == 'viewer':
+        _viewers.setdefault(session_id, set()).add(send)
+        try:
+            while (await receive())['type'] != 'websocket.disconnect':
+                pass
+        finally:
+            viewers = _viewers.get(session_id)
+            if viewers is not None:
+                viewers.discard(send)
+                if not viewers:
+                    del _viewers[session_id]
+        return
+
+    user_inputs, muscle_group = loaded
+    logger.info("Live risk stream opened for session %s at %s Hz", session_id, fs)
+    predictor = InjuryRiskPredictor()
+    loop = asyncio.get_running_loop()
+    scoring = None
+
+    async def score(features, t):
+        try:
+            risk_level, risk_score = await loop.run_in_executor(
+                None, predictor.score_from_features, user_inputs, features, muscle_group
+            )
+        except Exception as e:
+            logger.exception("Live risk scoring failed for session %s", session_id)
+            try:
+                await send({'type': 'websocket.send', 'text': json.dumps({'type': 'error', 'error': f'Scoring failed: {e}'})})
+            except Exception:
+                # The device went away; its handler is already shutting down
+                pass
+            return
+        await _broadcast(session_id, {
+            'type': 'risk',
+            'session_id': session_id,
+            'risk_level': risk_level,
+            'score': risk_score,
+            't': t,
+        }, device_send=send)
+
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event['type'] != 'websocket.receive':
+                continue
+            try:
+                samples = _decode_samples(event)
+            except ValueError as e:
+                await send({'type': 'websocket.send', 'text': json.dumps({'type': 'error', 'error': str(e)})})
+                continue
+            # Skip a hop rather than queue work when scoring falls behind
+            if scorer.push(samples) and (scoring is None or scoring.done()):
+                features = scorer.window_features()
+                scoring = asyncio.ensure_future(score(features, scorer.n_samples / fs))
+    finally:
+        if scoring is not None and not scoring.done():
+            await asyncio.wait([scoring])
@@ -0,0 +1,33 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from config import COMPILED_MODEL_PATHS, MODEL_PATHS
+from prediction.compiled import export_ensemble
+from prediction.registry import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = ("Flatten each per-muscle model into a NumPy-only artifact that loads without "
+            "scikit-learn. Serve them with MODEL_ARTIFACTS=compiled.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir',
+                            help="Directory for the artifacts (defaults to COMPILED_MODEL_PATHS)")
+        parser.add_argument('--format', choices=['joblib', 'npz'], default='joblib',
+                            help="joblib artifacts are memory-mapped when served; npz is a portable archive")
+
+    def handle(self, *args, **options):
+        # Always export from the sklearn pickles, whatever the server is using
+        registry = ModelRegistry(MODEL_PATHS)
+        for muscle_group in registry:
+            try:
+                compiled = export_ensemble(registry[muscle_group])
+            except ValueError as e:
+                raise CommandError(f"{muscle_group}: {e}")
+            output = COMPILED_MODEL_PATHS[muscle_group]
+            if options['format'] == 'npz':
+                output = output[:-len('.joblib')] + '.npz'
+            if options['output_dir']:
+                os.makedirs(options['output_dir'], exist_ok=True)
+                output = os.path.join(options['output_dir'], os.path.basename(output))
+            compiled.save(output)
+            self.stdout.write(f"{muscle_group}: wrote {output} ({compiled.feature.shape[0]} trees)")
@@ -0,0 +1,169 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from config import NOISE_LEVEL, SYNTHETIC_DATA_SIZE
+from feature_extraction.synthetic import SyntheticEMG
+
+USER = {
+    "name": "Load Test Athlete", "age": 22, "height": 178, "weight": 72, "training_frequency": 4,
+    "previous_injury": "none", "muscle_group": "calves", "contraction_type": "isometric",
+}
+STEPS = ('start_session', 'upload_emg', 'end_session', 'session_status', 'result')
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class VirtualDevice(threading.Thread):
+    """One device running start_session -> upload_emg x N -> end_session -> session_status on its own keep-alive connection."""
+
+    def __init__(self, index, server, options, barrier):
+        super().__init__(name=f'device-{index}', daemon=True)
+        parts = urlsplit(server)
+        self.conn = (http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection)(
+            parts.hostname, parts.port, timeout=options['timeout'])
+        self.prefix = parts.path.rstrip('/')
+        self.index = index
+        self.options = options
+        self.barrier = barrier
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = []
+        self.status = None
+
+    def call(self, step, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.conn.close()
+            raise CommandError(f"{step}: {e}")
+        self.latencies[step].append(time.perf_counter() - start)
+        try:
+            payload = json.loads(raw) if raw else {}
+        except ValueError:
+            # e.g. a proxy's HTML error page under load
+            raise CommandError(f"{step}: HTTP {response.status} with a non-JSON body")
+        if response.status >= 400:
+            raise CommandError(f"{step}: HTTP {response.status} {payload.get('error') or payload}")
+        return payload
+
+    def run(self):
+        options = self.options
+        fs = options['fs']
+        stream = SyntheticEMG(fs, options['noise_level'], seed=self.index)
+        interval = options['chunk_interval']
+        if interval is None:
+            interval = options['chunk_samples'] / fs
+        self.barrier.wait()
+        try:
+            session_id = self.call('start_session', 'POST', '/api/start_session/', {
+                'user': USER, 'duration': 3600, 'device_id': f'load-test-{self.index}',
+            })['session_id']
+            next_upload = time.monotonic()
+            for sequence in range(options['chunks']):
+                # Paced like a real device unless --chunk-interval 0
+                time.sleep(max(0.0, next_upload - time.monotonic()))
+                next_upload += interval
+                body = (stream.read(options['chunk_samples']) * 1000).astype('<i2').tobytes()
+                self.call('upload_emg', 'POST', '/api/upload_emg/', body, {
+                    'Content-Type': 'application/octet-stream', 'X-Session-Id': str(session_id),
+                    'X-Chunk-Sequence': str(sequence), 'X-EMG-Dtype': 'int16', 'X-Sample-Rate': str(fs),
+                })
+            ended = time.perf_counter()
+            self.call('end_session', 'POST', '/api/end_session/', {'session_id': session_id, 'fs': fs})
+            deadline = time.monotonic() + options['timeout']
+            while True:
+                self.status = self.call('session_status', 'GET', f'/api/session_status/?session_id={session_id}').get('status')
+                if self.status in ('completed', 'failed') or time.monotonic() > deadline:
+                    break
+                time.sleep(options['poll_interval'])
+            if self.status == 'completed':
+                self.latencies['result'].append(time.perf_counter() - ended)
+            else:
+                self.errors.append(f"session {session_id} ended as {self.status}")
+        except CommandError as e:
+            self.errors.append(str(e))
+        finally:
+            self.conn.close()
+
+
+class Command(BaseCommand):
+    help = ("Run --devices virtual devices against a running backend at once, each going "
+            "through start_session, upload_emg, end_session and session_status, and report "
+            "throughput and latency percentiles. 'result' is end_session until the "
+            "session is completed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', default='http://127.0.0.1:8000', help="Backend base URL")
+        parser.add_argument('--devices', type=int, default=10)
+        parser.add_argument('--chunks', type=int, default=10, help="Uploads per session")
+        parser.add_argument('--chunk-samples', type=int, default=SYNTHETIC_DATA_SIZE)
+        parser.add_argument('--fs', type=float, default=1000)
+        parser.add_argument('--chunk-interval', type=float,
+                            help="Seconds between uploads (default: real time, chunk-samples / fs; 0 = as fast as possible)")
+        parser.add_argument('--noise-level', type=float, default=NOISE_LEVEL)
+        parser.add_argument('--poll-interval', type=float, default=0.2)
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        barrier = threading.Barrier(options['devices'] + 1)
+        devices = [VirtualDevice(i, options['server'], options, barrier) for i in range(options['devices'])]
+        for device in devices:
+            device.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for device in devices:
+            device.join()
+        elapsed = time.perf_counter() - start
+
+        report = {
+            'devices': options['devices'],
+            'wall_seconds': elapsed,
+            'sessions_completed': sum(device.status == 'completed' for device in devices),
+            'errors': [error for device in devices for error in device.errors],
+            'steps': {},
+        }
+        uploads = sum(len(device.latencies['upload_emg']) for device in devices)
+        report['uploads_per_second'] = uploads / elapsed
+        report['samples_per_second'] = uploads * options['chunk_samples'] / elapsed
+        for step in STEPS:
+            values = sorted(value * 1000 for device in devices for value in device.latencies[step])
+            if values:
+                report['steps'][step] = {
+                    'n': len(values),
+                    'p50_ms': percentile(values, 0.5),
+                    'p90_ms': percentile(values, 0.9),
+                    'p99_ms': percentile(values, 0.99),
+                    'max_ms': values[-1],
+                    'mean_ms': statistics.fmean(values),
+                }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(
+                f"{report['sessions_completed']}/{options['devices']} sessions completed in {elapsed:.1f}s; "
+                f"{report['uploads_per_second']:.1f} uploads/s, {report['samples_per_second']:.0f} samples/s"
+            )
+            self.stdout.write(f"{'step':<16}{'n':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+            for step, stats in report['steps'].items():
+                self.stdout.write(
+                    f"{step:<16}{stats['n']:>7}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+                    f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+                )
+            for error in report['errors'][:10]:
+                self.stderr.write(error)
+        if report['errors']:
+            raise CommandError(f"{len(report['errors'])} device(s) failed")
@@ -0,0 +1,139 @@
+import gc
+import json
+import os
+import resource
+import tempfile
+import traceback
+from django.core.management.base import BaseCommand, CommandError
+from config import COMPILED_MODEL_PATHS, MODEL_PATHS
+from prediction.compiled import compiled_model, export_ensemble
+from prediction.predictor import InjuryRiskPredictor
+from prediction.registry import ModelRegistry
+
+SAMPLE_INPUTS = {
+    "age": 21, "height": 180, "weight": 75, "bmi": 23.1, "training_frequency": 4,
+    "previous_injury": "none", "contraction_type": "isometric",
+}
+
+
+def process_memory():
+    """Memory of the current process in kB: rss, pss and private (Linux smaps_rollup)."""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        # No per-mapping accounting; peak RSS is the best available
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+    def kb(name):
+        return int(fields.get(name, '0 kB').split()[0])
+    return {
+        'rss': kb('Rss'),
+        'pss': kb('Pss'),
+        'private': kb('Private_Clean') + kb('Private_Dirty'),
+    }
+
+
+def _load_and_score(registry):
+    predictor = InjuryRiskPredictor(registry)
+    for muscle_group in registry:
+        predictor.score_from_features(SAMPLE_INPUTS, {}, muscle_group)
+        compiled_model(registry[muscle_group])
+
+
+class Command(BaseCommand):
+    help = ("Fork a set of workers the way gunicorn does and report each worker's memory "
+            "before and after loading the models, for pickles vs memory-mapped compiled "
+            "artifacts, with and without --preload.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Workers to fork per scenario")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        if not hasattr(os, 'fork'):
+            raise CommandError("model_memory_report needs os.fork")
+        compiled_paths = dict(COMPILED_MODEL_PATHS)
+        tmp_dir = None
+        if not all(os.path.exists(path) for path in compiled_paths.values()):
+            # Export to a scratch directory rather than touching backend/models
+            tmp_dir = tempfile.TemporaryDirectory()
+            source = ModelRegistry(MODEL_PATHS)
+            for muscle_group in source:
+                compiled_paths[muscle_group] = os.path.join(tmp_dir.name, os.path.basename(compiled_paths[muscle_group]))
+                export_ensemble(source[muscle_group]).save(compiled_paths[muscle_group])
+
+        scenarios = [
+            ('pickle', MODEL_PATHS, False),
+            ('pickle+preload', MODEL_PATHS, True),
+            ('compiled-mmap', compiled_paths, False),
+            ('compiled-mmap+preload', compiled_paths, True),
+        ]
+        try:
+            report = {name: self._run(paths, preload, options['workers']) for name, paths, preload in scenarios}
+        finally:
+            if tmp_dir is not None:
+                tmp_dir.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"{'scenario':<24}{'rss before':>12}{'rss after':>12}{'pss after':>12}{'private':>12}{'total pss':>12}  (kB per worker)")
+        for name, workers in report.items():
+            def mean(stage, key, workers=workers):
+                return sum(w[stage].get(key, 0) for w in workers) // len(workers)
+            total_pss = sum(w['after'].get('pss', 0) for w in workers)
+            self.stdout.write(
+                f"{name:<24}{mean('before', 'rss'):>12}{mean('after', 'rss'):>12}"
+                f"{mean('after', 'pss'):>12}{mean('after', 'private'):>12}{total_pss:>12}"
+            )
+
+    def _run(self, paths, preload, n_workers):
+        registry = None
+        if preload:
+            registry = ModelRegistry(paths)
+            _load_and_score(registry)
+            gc.freeze()
+        go_read, go_write = os.pipe()
+        done_read, done_write = os.pipe()
+        children = []
+        for _ in range(n_workers):
+            result_read, result_write = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                status = 0
+                try:
+                    os.close(result_read)
+                    before = process_memory()
+                    _load_and_score(registry if registry is not None else ModelRegistry(paths))
+                    os.write(result_write, b'ready\n')
+                    # Measure only once every worker is loaded, since PSS
+                    # splits shared pages between the processes mapping them
+                    os.read(go_read, 1)
+                    after = process_memory()
+                    os.write(result_write, json.dumps({'before': before, 'after': after}).encode() + b'\n')
+                    os.read(done_read, 1)
+                except Exception:
+                    traceback.print_exc()
+                    status = 1
+                finally:
+                    os._exit(status)
+            os.close(result_write)
+            children.append((pid, os.fdopen(result_read)))
+
+        try:
+            for _, result in children:
+                if result.readline().strip() != 'ready':
+                    raise CommandError("A worker failed to load the models")
+            os.write(go_write, b'x' * n_workers)
+            workers = [json.loads(result.readline()) for _, result in children]
+            os.write(done_write, b'x' * n_workers)
+        finally:
+            for pid, result in children:
+                result.close()
+                os.waitpid(pid, 0)
+            for fd in (go_read, go_write, done_read, done_write):
+                os.close(fd)
+            if preload:
+                gc.unfreeze()
+        return workers
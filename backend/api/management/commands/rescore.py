@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from prediction.predictor import InjuryRiskPredictor
+
+from api.jobs import refresh_latest_risk
+from api.models import EMGData, FeatureSet, RiskScore
+
+
+class Command(BaseCommand):
+    help = ("Re-run the current models over stored FeatureSet rows and record new RiskScores, "
+            "without touching the raw EMG signals.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--muscle', choices=['calves', 'hamstrings', 'quadriceps'],
+                            help="Only rescore feature sets for this muscle group")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Feature sets scored per model call")
+        parser.add_argument('--force', action='store_true',
+                            help="Rescore even if the latest score already comes from the current model")
+
+    def handle(self, *args, **options):
+        predictor = InjuryRiskPredictor()
+        latest_version = RiskScore.objects.filter(feature_set=OuterRef('pk')).order_by('-id').values('model_version')[:1]
+        feature_sets = (
+            FeatureSet.objects
+            .select_related('emg_data')
+            .annotate(latest_model_version=Subquery(latest_version))
+            .order_by('id')
+        )
+        if options['muscle']:
+            feature_sets = feature_sets.filter(features__muscle_group=options['muscle'])
+
+        totals = {'scored': 0, 'skipped': 0}
+        batch = []
+        for feature_set in feature_sets.iterator(chunk_size=options['batch_size']):
+            features = feature_set.features or {}
+            if not all(key in features for key in ('muscle_group', 'user_inputs', 'emg')):
+                # Written before the pipeline stored its inputs
+                totals['skipped'] += 1
+                continue
+            if not options['force'] and feature_set.latest_model_version == predictor.model_version(features['muscle_group']):
+                totals['skipped'] += 1
+                continue
+            batch.append(feature_set)
+            if len(batch) >= options['batch_size']:
+                totals['scored'] += self._rescore(predictor, batch)
+                batch = []
+        if batch:
+            totals['scored'] += self._rescore(predictor, batch)
+
+        self.stdout.write(f"Rescored {totals['scored']} feature sets ({totals['skipped']} skipped)")
+
+    def _rescore(self, predictor, feature_sets):
+        results = predictor.score_features_batch(
+            (fs.features['user_inputs'], fs.features['emg'], fs.features['muscle_group']) for fs in feature_sets
+        )
+        risk_scores = []
+        emg_rows = {}
+        for feature_set, (risk_level, score) in zip(feature_sets, results):
+            risk_scores.append(RiskScore(
+                feature_set=feature_set,
+                score=score,
+                level=risk_level,
+                model_version=predictor.model_version(feature_set.features['muscle_group']),
+            ))
+            # Feature sets are ordered by id, so the newest one per recording wins
+            emg_data = feature_set.emg_data
+            emg_data.risk_level = risk_level
+            emg_rows[emg_data.id] = emg_data
+        with transaction.atomic():
+            RiskScore.objects.bulk_create(risk_scores)
+            EMGData.objects.bulk_update(list(emg_rows.values()), ['risk_level'])
+            refresh_latest_risk({emg_data.user_id for emg_data in emg_rows.values()})
+        return len(risk_scores)
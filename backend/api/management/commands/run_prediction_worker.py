@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued end_session prediction jobs from the PredictionJob table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait between polls when the queue is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue and exit instead of polling forever")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Prediction worker started")
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                job = run_job(job)
+                self.stdout.write(f"Job {job.id} for session {job.session_id}: {job.status}")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write("Prediction worker stopped")
@@ -0,0 +1,63 @@
+import socket
+import socketserver
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from config import NOISE_LEVEL, SYNTHETIC_DATA_SIZE
+from feature_extraction.synthetic import SyntheticEMG
+
+
+class Command(BaseCommand):
+    help = ("Serve synthetic EMG over TCP the way the ESP32 firmware does: one integer "
+            "per line at --fs samples per second, to every client that connects.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=3333)
+        parser.add_argument('--fs', type=float, default=1000, help="Samples per second per client")
+        parser.add_argument('--noise-level', type=float, default=NOISE_LEVEL)
+        parser.add_argument('--scale', type=float, default=1000, help="ADC counts per unit of signal")
+        parser.add_argument('--block-size', type=int, default=SYNTHETIC_DATA_SIZE,
+                            help="Samples generated at a time")
+        parser.add_argument('--send-interval', type=float, default=0.01,
+                            help="Seconds between sends; samples due in between go out together")
+
+    def handle(self, *args, **options):
+        fs = options['fs']
+        stdout = self.stdout
+        clients = iter(range(1 << 30))
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                client = next(clients)
+                stream = SyntheticEMG(fs, options['noise_level'], seed=client)
+                pending = np.empty(0)
+                sent = 0
+                start = time.monotonic()
+                stdout.write(f"Client {client} connected from {self.client_address[0]}")
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                try:
+                    while True:
+                        due = int((time.monotonic() - start) * fs) - sent
+                        while len(pending) < due:
+                            pending = np.concatenate([pending, stream.read(options['block_size'])])
+                        if due > 0:
+                            values = np.round(pending[:due] * options['scale']).astype(int)
+                            pending = pending[due:]
+                            self.request.sendall(('\n'.join(map(str, values.tolist())) + '\n').encode())
+                            sent += due
+                        time.sleep(options['send_interval'])
+                except OSError:
+                    pass
+                stdout.write(f"Client {client} disconnected after {sent} samples")
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        with Server((options['host'], options['port']), Handler) as server:
+            self.stdout.write(f"Simulating an ESP32 at {fs:g} Hz on {options['host']}:{options['port']} (Ctrl-C to stop)")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
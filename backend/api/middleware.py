@@ -0,0 +1,182 @@
+import json
+import logging
+import random
+import time
+import numpy as np
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+import metrics
+
+from .parsers import EMG_DTYPES
+
+request_logger = logging.getLogger('api.requests')
+
+
+class RequestMetricsMiddleware:
+    """Count and time every request and add a Server-Timing header.
+
+    Requests are labelled by their URL route (``api/upload_emg/``) rather
+    than the raw path, so query strings and ids don't explode the label set.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        token = metrics.begin_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stages = metrics.end_request(token)
+        return self._record(request, response, stages, time.perf_counter() - start)
+
+    async def _acall(self, request):
+        token = metrics.begin_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stages = metrics.end_request(token)
+        return self._record(request, response, stages, time.perf_counter() - start)
+
+    def _record(self, request, response, stages, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.route if match is not None else 'unmatched'
+        metrics.http_requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.http_request_duration_seconds.observe(elapsed, endpoint=endpoint, method=request.method)
+        if getattr(settings, 'SERVER_TIMING', True):
+            response['Server-Timing'] = metrics.server_timing(stages, total=elapsed)
+        return response
+
+
+def summarize(value, max_items=5, max_chars=200, depth=0):
+    """Small JSON-safe stand-in for a request body: sizes and types instead of samples."""
+    if isinstance(value, np.ndarray):
+        return {'type': 'ndarray', 'dtype': str(value.dtype), 'shape': list(value.shape), 'bytes': value.nbytes}
+    if isinstance(value, (list, tuple)):
+        if len(value) > max_items or depth >= 2:
+            first = value[0] if value else None
+            return {'type': 'list', 'length': len(value), 'item_type': type(first).__name__}
+        return [summarize(item, max_items, max_chars, depth + 1) for item in value]
+    if isinstance(value, dict):
+        summary = {str(key): summarize(item, max_items, max_chars, depth + 1) for key, item in list(value.items())[:max_items * 4]}
+        if len(value) > max_items * 4:
+            summary['...'] = f'{len(value) - max_items * 4} more keys'
+        return summary
+    if isinstance(value, str) and len(value) > max_chars:
+        return f'{value[:max_chars]}...(+{len(value) - max_chars} chars)'
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)[:max_chars]
+
+
+class RequestLog:
+    """Lazily built summary of one request; only formatted if a handler emits it."""
+
+    def __init__(self, request, response, elapsed, body=None):
+        self.request = request
+        self.response = response
+        self.elapsed = elapsed
+        self.body = body
+        self._fields = None
+
+    def _body_summary(self):
+        request = self.request
+        content_type = request.content_type or ''
+        size = int(request.META.get('CONTENT_LENGTH') or 0)
+        if not size:
+            return None
+        if content_type in ('application/octet-stream', 'application/x-npy'):
+            dtype = request.META.get('HTTP_X_EMG_DTYPE') or request.GET.get('dtype')
+            summary = {'bytes': size, 'dtype': 'npy' if content_type == 'application/x-npy' else dtype or 'float32'}
+            dtype = EMG_DTYPES.get(summary['dtype'])
+            if dtype is not None:
+                summary['samples'] = size // dtype.itemsize
+            return summary
+        if self.body is not None:
+            try:
+                return summarize(json.loads(self.body))
+            except ValueError:
+                pass
+        return {'bytes': size, 'content_type': content_type}
+
+    def as_dict(self):
+        if self._fields is None:
+            match = getattr(self.request, 'resolver_match', None)
+            self._fields = {
+                'method': self.request.method,
+                'endpoint': match.route if match is not None else None,
+                'path': self.request.path,
+                'status': self.response.status_code,
+                'duration_ms': round(self.elapsed * 1000, 2),
+                'query': summarize(dict(self.request.GET.items())) or None,
+                'body': self._body_summary(),
+            }
+        return self._fields
+
+    def __str__(self):
+        return json.dumps(self.as_dict(), default=str)
+
+
+class RequestLoggingMiddleware:
+    """One structured INFO record per request on the ``api.requests`` logger.
+
+    Bodies are summarized (array lengths, dtypes, byte sizes) instead of
+    dumped, and only JSON bodies up to REQUEST_LOG_MAX_BODY_BYTES are looked
+    at. Paths in REQUEST_LOG_SAMPLE_RATES are logged for that fraction of
+    requests; errors and requests slower than REQUEST_LOG_SLOW_MS are always
+    logged. The record is only formatted if a handler actually emits it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        sampled, body = self._before(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._after(request, response, time.perf_counter() - start, sampled, body)
+        return response
+
+    async def _acall(self, request):
+        sampled, body = self._before(request)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._after(request, response, time.perf_counter() - start, sampled, body)
+        return response
+
+    def _before(self, request):
+        if not request_logger.isEnabledFor(logging.INFO):
+            return False, None
+        rate = getattr(settings, 'REQUEST_LOG_SAMPLE_RATES', {}).get(request.path_info, 1.0)
+        sampled = rate >= 1.0 or random.random() < rate
+        body = None
+        size = int(request.META.get('CONTENT_LENGTH') or 0)
+        if sampled and request.content_type == 'application/json' and 0 < size <= getattr(settings, 'REQUEST_LOG_MAX_BODY_BYTES', 65536):
+            # Read now (Django keeps it for the parsers); decoded only if the record is emitted
+            body = request.body
+        return sampled, body
+
+    def _after(self, request, response, elapsed, sampled, body):
+        if not request_logger.isEnabledFor(logging.INFO):
+            return
+        slow = elapsed * 1000 >= getattr(settings, 'REQUEST_LOG_SLOW_MS', 1000)
+        if sampled or slow or response.status_code >= 400:
+            record = RequestLog(request, response, elapsed, body)
+            level = logging.WARNING if response.status_code >= 500 else logging.INFO
+            request_logger.log(level, '%s', record, extra={'request_log': record})
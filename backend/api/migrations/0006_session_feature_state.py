@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_emgdata_risk_level'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='feature_state',
+            field=models.JSONField(blank=True, help_text='Streaming feature extractor state, updated per uploaded chunk', null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_session_feature_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EMGChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField(help_text='Position of the chunk within the session, starting at 0')),
+                ('dtype', models.CharField(help_text='Sample type of the decoded chunk', max_length=16)),
+                ('encoding', models.CharField(help_text='Compression applied to the samples, e.g. zlib or delta+zlib', max_length=32)),
+                ('n_samples', models.PositiveIntegerField()),
+                ('data', models.BinaryField(help_text='Compressed little-endian samples')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emg_chunks', to='api.session')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'sequence'), name='unique_emg_chunk_sequence')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_predictionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskscore',
+            name='model_version',
+            field=models.CharField(blank=True, default='', help_text='Model that produced the score', max_length=64),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:57
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Lower
+
+
+def backfill_search_and_latest_risk(apps, schema_editor):
+    UserProfile = apps.get_model('api', 'UserProfile')
+    RiskScore = apps.get_model('api', 'RiskScore')
+    latest = RiskScore.objects.filter(feature_set__emg_data__user=OuterRef('pk')).order_by(
+        '-feature_set__emg_data__timestamp', '-feature_set__timestamp', '-feature_set_id', '-timestamp', '-id'
+    )
+    UserProfile.objects.update(
+        search_name=Lower('name'),
+        latest_risk_level=Subquery(latest.values('level')[:1]),
+        latest_risk_score=Subquery(latest.values('score')[:1]),
+        latest_risk_at=Subquery(latest.values('timestamp')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_riskscore_model_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='latest_risk_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='latest_risk_level',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='latest_risk_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_search_and_latest_risk, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_userprofile_search_and_latest_risk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='featureset',
+            name='signal_hash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='feature_extraction.cache.signal_key of the signal the features came from', max_length=64),
+        ),
+    ]
@@ -0,0 +1,41 @@
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def create_trigram_index(apps, schema_editor):
+    # icontains-style substring search can only use a trigram index, which is PostgreSQL-only
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        # Savepoint, so a refused CREATE EXTENSION doesn't abort the migration's transaction
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as e:
+        # Creating pg_trgm needs a superuser (or a trusted-extension owner) on most hosts;
+        # search still works without the index, it just scans the table
+        logger.warning("Skipping the search_name trigram index, pg_trgm is unavailable: %s", e)
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS api_userprofile_search_name_trgm '
+        'ON api_userprofile USING gin (search_name gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS api_userprofile_search_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_featureset_signal_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_userprofile_search_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+    ]
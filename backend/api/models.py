@@ -24,6 +24,19 @@ class UserProfile(models.Model):
         ("isotonic", "Isotonic")
     ])
     created_at = models.DateTimeField(auto_now_add=True)
+    # Lowercased name for substring search (trigram-indexed on PostgreSQL)
+    search_name = models.CharField(max_length=100, editable=False, default="")
+    # Denormalized from the newest RiskScore, kept up to date by the prediction pipeline
+    latest_risk_level = models.CharField(max_length=20, null=True, blank=True, editable=False)
+    latest_risk_score = models.FloatField(null=True, blank=True, editable=False)
+    latest_risk_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.search_name = self.name.lower()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"search_name"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.name} ({self.age})"
@@ -43,6 +56,7 @@ class Session(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     device_id = models.CharField(max_length=32, help_text="Device MAC address or unique ID", null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    feature_state = models.JSONField(null=True, blank=True, help_text="Streaming feature extractor state, updated per uploaded chunk")
 
     def __str__(self):
         return f"Session {self.id} for {self.user.name} ({self.status})"
@@ -57,9 +71,46 @@ class EMGData(models.Model):
     def __str__(self):
         return f"EMGData for {self.user.name} at {self.timestamp}"
 
+class EMGChunk(models.Model):
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="emg_chunks")
+    sequence = models.PositiveIntegerField(help_text="Position of the chunk within the session, starting at 0")
+    dtype = models.CharField(max_length=16, help_text="Sample type of the decoded chunk")
+    encoding = models.CharField(max_length=32, help_text="Compression applied to the samples, e.g. zlib or delta+zlib")
+    n_samples = models.PositiveIntegerField()
+    data = models.BinaryField(help_text="Compressed little-endian samples")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["session", "sequence"], name="unique_emg_chunk_sequence"),
+        ]
+
+    def __str__(self):
+        return f"EMGChunk {self.sequence} of session {self.session_id} ({self.n_samples} samples)"
+
+class PredictionJob(models.Model):
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="prediction_jobs")
+    status = models.CharField(max_length=20, choices=[
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed")
+    ], default="queued")
+    fs = models.FloatField(default=1000, help_text="Sample rate of the session's EMG signal in Hz")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"PredictionJob {self.id} for session {self.session_id} ({self.status})"
+
 class FeatureSet(models.Model):
     emg_data = models.ForeignKey(EMGData, on_delete=models.CASCADE, related_name="feature_sets")
     features = models.JSONField(help_text="Extracted features from EMG data")
+    signal_hash = models.CharField(max_length=64, blank=True, default="", db_index=True,
+                                   help_text="feature_extraction.cache.signal_key of the signal the features came from")
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -73,6 +124,7 @@ class RiskScore(models.Model):
         ("medium", "Medium"),
         ("high", "High")
     ])
+    model_version = models.CharField(max_length=64, blank=True, default="", help_text="Model that produced the score")
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -0,0 +1,90 @@
+import io
+import numpy as np
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+# Sample formats accepted for raw uploads; always little-endian on the wire
+EMG_DTYPES = {
+    'int16': np.dtype('<i2'),
+    'int32': np.dtype('<i4'),
+    'float32': np.dtype('<f4'),
+    'float64': np.dtype('<f8'),
+}
+NPY_MAGIC = b'\x93NUMPY'
+
+
+def _upload_param(request, header, query_param, default=None):
+    value = request.META.get(header)
+    if value is None:
+        value = request.GET.get(query_param, default)
+    return value
+
+
+def decode_npy(body):
+    """Decode a 1-D ``.npy`` payload without copying the sample buffer."""
+    header = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+    except ValueError as e:
+        raise ParseError(f"Malformed .npy payload: {e}")
+    if fortran_order or len(shape) != 1:
+        raise ParseError(".npy payload must be a 1-D array")
+    if dtype.hasobject:
+        raise ParseError(".npy payload must contain numeric samples")
+    try:
+        return np.frombuffer(body, dtype=dtype, count=shape[0], offset=header.tell())
+    except ValueError as e:
+        raise ParseError(f"Truncated .npy payload: {e}")
+
+
+class EMGBinaryParser(BaseParser):
+    """Parse raw EMG sample buffers sent by the sensor nodes.
+
+    The body is either a bare little-endian buffer whose sample type comes
+    from the ``X-EMG-Dtype`` header (or ``dtype`` query param), or a ``.npy``
+    file. ``X-Session-Id``/``session_id``, ``X-Sample-Rate``/``fs`` and
+    ``X-Chunk-Sequence``/``sequence`` are read the same way. Samples are
+    decoded with ``np.frombuffer`` and handed to the view as ``emg_data``
+    without going through Python floats.
+    """
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        body = stream.read() if stream is not None else b''
+        if not body:
+            raise ParseError("Empty EMG payload")
+
+        if body.startswith(NPY_MAGIC):
+            emg_data = decode_npy(body)
+        else:
+            dtype_name = _upload_param(request, 'HTTP_X_EMG_DTYPE', 'dtype', 'float32')
+            dtype = EMG_DTYPES.get(dtype_name)
+            if dtype is None:
+                raise ParseError(f"Unsupported dtype '{dtype_name}', expected one of: {', '.join(EMG_DTYPES)}")
+            if len(body) % dtype.itemsize:
+                raise ParseError(f"Payload size {len(body)} is not a multiple of {dtype_name} ({dtype.itemsize} bytes)")
+            emg_data = np.frombuffer(body, dtype=dtype)
+
+        data = {'emg_data': emg_data}
+        session_id = _upload_param(request, 'HTTP_X_SESSION_ID', 'session_id')
+        if session_id is not None:
+            data['session_id'] = session_id
+        sequence = _upload_param(request, 'HTTP_X_CHUNK_SEQUENCE', 'sequence')
+        if sequence is not None:
+            data['sequence'] = sequence
+        fs = _upload_param(request, 'HTTP_X_SAMPLE_RATE', 'fs')
+        if fs is not None:
+            try:
+                data['fs'] = float(fs)
+            except ValueError:
+                raise ParseError(f"Invalid sample rate '{fs}'")
+        return data
+
+
+class NpyParser(EMGBinaryParser):
+    media_type = 'application/x-npy'
@@ -1,3 +1,634 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from config import MODEL_PATHS
+from feature_extraction.cache import FeatureCache, signal_key
+from feature_extraction.emg_features import extract_features, filter_signal, get_filter_chain
+from feature_extraction.spectral import extract_spectral_features
+from feature_extraction.streaming import StreamingFeatureExtractor
+from feature_extraction.synthetic import SyntheticEMG
+from prediction.predictor import COMPILED_MAX_ROWS, InjuryRiskPredictor, feature_schema
+from prediction.compiled import CompiledEnsemble, export_ensemble, is_compiled_artifact
+from prediction.registry import ModelRegistry
+from .models import UserProfile, Session, EMGData, EMGChunk, PredictionJob, FeatureSet, RiskScore
+from .emg_storage import encode_samples, read_session_signal
+from .feature_store import FeatureSetStore
+from .jobs import build_user_inputs, claim_next_job, refresh_latest_risk, run_session_prediction
+from .events import notify_session
+from .live import live_risk_websocket
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'model_calves.pkl')
+        shutil.copy(MODEL_PATHS['calves'], self.path)
+        self.registry = ModelRegistry({'calves': self.path})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_loads_lazily_and_caches(self):
+        self.assertFalse(self.registry.is_loaded('calves'))
+        model = self.registry['calves']
+        self.assertTrue(self.registry.is_loaded('calves'))
+        self.assertIs(self.registry['calves'], model)
+
+    def test_reloads_when_file_changes(self):
+        model = self.registry['calves']
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertIsNot(self.registry['calves'], model)
+
+    def test_unknown_muscle_group(self):
+        with self.assertRaises(KeyError):
+            self.registry['biceps']
+
+    def test_compiled_artifact_is_memory_mapped(self):
+        path = os.path.join(self.tmpdir, 'model_calves.compiled.joblib')
+        export_ensemble(self.registry['calves']).save(path)
+        self.registry.use_paths({'calves': path})
+        self.assertFalse(self.registry.is_loaded('calves'))
+        compiled = self.registry['calves']
+        self.assertIsInstance(compiled, CompiledEnsemble)
+        self.assertIsInstance(compiled.threshold, np.memmap)
+        X = np.zeros((1, compiled.n_features_in_))
+        np.testing.assert_allclose(compiled.predict_proba(X), ModelRegistry(MODEL_PATHS)['calves'].predict_proba(X))
+
+
+class FeatureExtractionTests(SimpleTestCase):
+    def test_multichannel_matches_per_channel(self):
+        signals = np.random.default_rng(1).normal(size=(3, 2000))
+        features = extract_features(signals, fs=1000)
+        for channel, signal in enumerate(signals):
+            for name, value in extract_features(signal, fs=1000).items():
+                self.assertAlmostEqual(features[name][channel], value)
+
+    def test_filter_chain_notch_and_chunked_state(self):
+        t = np.arange(4000) / 1000
+        hum = np.sin(2 * np.pi * 60 * t)
+        for zero_phase in (False, True):
+            filtered = filter_signal(hum, fs=1000, zero_phase=zero_phase)
+            self.assertLess(np.abs(filtered[1000:3000]).max(), 0.01)
+        chain = get_filter_chain(1000)
+        self.assertIs(chain, get_filter_chain(1000))
+        signal = np.random.default_rng(7).normal(size=3000)
+        zi = chain.initial_state()
+        pieces = []
+        for chunk in np.array_split(signal, 4):
+            out, zi = chain.apply(chunk, zi=zi)
+            pieces.append(out)
+        np.testing.assert_allclose(np.concatenate(pieces), filter_signal(signal, fs=1000, zero_phase=False))
+
+    def test_spectral_features_track_frequency_and_trends(self):
+        fs = 1000
+        t = np.arange(10 * fs) / fs
+        noise = 0.05 * np.random.default_rng(2).normal(size=t.size)
+        signal = np.sin(2 * np.pi * 120 * t) * (1 + t) + noise
+        features = extract_spectral_features(signal, fs)
+        self.assertAlmostEqual(features['MDF'], 120, delta=5)
+        self.assertAlmostEqual(features['MNF'], 120, delta=10)
+        self.assertGreater(features['rms_time_corr'], 0.9)
+
+    def test_synthetic_emg_is_continuous_and_in_band(self):
+        whole = SyntheticEMG(1000, seed=3).read(8000)
+        stream = SyntheticEMG(1000, seed=3)
+        np.testing.assert_allclose(np.concatenate([stream.read(n) for n in (1000, 333, 6667)]), whole)
+        features = extract_spectral_features(whole, 1000)
+        self.assertTrue(20 < features['MDF'] < 450)
+
+
+USER_INPUTS = {
+    "age": 21,
+    "height": 180,
+    "weight": 75,
+    "bmi": 75 / 1.8 ** 2,
+    "training_frequency": 4,
+    "previous_injury": "none",
+    "contraction_type": "isometric",
+}
+
+
+class PredictBatchTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.signals = [rng.normal(scale=scale, size=3000) for scale in (0.1, 0.5, 1.0, 2.0)]
+
+    def test_batch_matches_single_predictions(self):
+        predictor = InjuryRiskPredictor()
+        muscles = ['calves', 'hamstrings', 'calves', 'quadriceps']
+        items = [(USER_INPUTS, signal, muscle) for signal, muscle in zip(self.signals, muscles)]
+        expected = [predictor.predict(*item) for item in items]
+        self.assertEqual(predictor.predict_batch(items), expected)
+
+    def test_feature_schema_matches_dataframe_reindex(self):
+        predictor = InjuryRiskPredictor()
+        features = extract_features(self.signals[2], fs=1000)
+        for muscle in MODEL_PATHS:
+            model = predictor.models[muscle]
+            schema = feature_schema(model)
+            self.assertIs(schema, feature_schema(model))
+            expected = predictor.prepare_features_for_prediction(USER_INPUTS, features, muscle).reindex(
+                columns=model.feature_names_in_, fill_value=0
+            )
+            np.testing.assert_array_equal(schema.matrix([(USER_INPUTS, features)], muscle), expected.to_numpy(dtype=float))
+
+    def test_emg_features_reach_the_model(self):
+        predictor = InjuryRiskPredictor()
+        for muscle in MODEL_PATHS:
+            schema = feature_schema(predictor.models[muscle])
+            quiet, loud = (
+                schema.matrix([(USER_INPUTS, extract_features(self.signals[2] * scale, fs=1000))], muscle)
+                for scale in (1e-3, 1e4)
+            )
+            rms = schema.index[f'rms_{muscle}']
+            self.assertGreater(loud[0, rms], quiet[0, rms])
+            self.assertFalse(np.array_equal(quiet, loud))
+
+    def test_compiled_ensemble_matches_sklearn(self):
+        predictor = InjuryRiskPredictor(compiled=False)
+        rows = [
+            (dict(USER_INPUTS, age=age, previous_injury=injury), extract_features(signal, fs=1000))
+            for age in (18, 25, 40) for injury in ('none', 'calves') for signal in self.signals
+        ]
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        for muscle in MODEL_PATHS:
+            model = predictor.models[muscle]
+            X = feature_schema(model).matrix(rows, muscle)
+            path = os.path.join(tmp, f'{muscle}.npz')
+            export_ensemble(model).save(path)
+            compiled = CompiledEnsemble.load(path)
+            np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+            np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-12)
+            # Artifacts from before the flat-node layout still carry missing_left
+            self.assertFalse(is_compiled_artifact(dict(compiled.arrays(), format_version=np.array(1))))
+            with self.assertRaises(ValueError):
+                compiled.predict(np.where(np.arange(X.shape[1]) == 0, np.nan, X[0])[None, :])
+
+    def test_large_batches_use_sklearn(self):
+        predictor = InjuryRiskPredictor()
+        model = predictor.models['calves']
+        self.assertIsInstance(predictor._engine(model, COMPILED_MAX_ROWS), CompiledEnsemble)
+        self.assertIs(predictor._engine(model, COMPILED_MAX_ROWS + 1), model)
+
+    def test_endpoint_scores_sessions_and_raw_items(self):
+        user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="hamstrings", contraction_type="isometric",
+        )
+        session = Session.objects.create(user=user, duration=30, device_id="esp32")
+        EMGData.objects.create(user=user, session=session, raw_data=self.signals[0].tolist())
+        response = self.client.post('/api/predict_batch/', {
+            'items': [
+                {'session_id': session.id},
+                {'user_inputs': USER_INPUTS, 'emg_data': self.signals[1].tolist(), 'muscle_group': 'calves'},
+            ]
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['session_id'], session.id)
+        self.assertIn(results[1]['risk_level'], ('low', 'medium', 'high'))
+
+    def test_endpoint_rejects_empty_batch(self):
+        response = self.client.post('/api/predict_batch/', {'items': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_rejects_non_numeric_session_id(self):
+        response = self.client.post('/api/predict_batch/', {
+            'items': [{'session_id': 'abc'}]
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_rejects_invalid_fs_and_samples(self):
+        item = {'user_inputs': USER_INPUTS, 'emg_data': self.signals[0].tolist(), 'muscle_group': 'calves'}
+        for body in (
+            {'items': [item], 'fs': 'fast'},
+            {'items': [item], 'fs': 0},
+            {'items': [dict(item, emg_data=['a', 1.0])]},
+        ):
+            response = self.client.post('/api/predict_batch/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+
+
+class StreamingSessionTests(TestCase):
+    def setUp(self):
+        self.user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="calves", contraction_type="isometric",
+        )
+        self.session = Session.objects.create(user=self.user, duration=30, device_id="esp32")
+        self.signal = np.random.default_rng(4).normal(size=4500)
+
+    def test_chunked_upload_matches_whole_signal(self):
+        for chunk in np.array_split(self.signal, 3):
+            response = self.client.post('/api/upload_emg/', {
+                'session_id': self.session.id, 'emg_data': chunk.tolist()
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+        self.session.refresh_from_db()
+        streamed = StreamingFeatureExtractor.from_state(self.session.feature_state).finalize()
+        for name, value in extract_features(self.signal, fs=1000).items():
+            self.assertAlmostEqual(streamed[name], value)
+
+        with override_settings(PREDICTION_WORKER='external'):
+            response = self.client.post('/api/end_session/', {'session_id': self.session.id}, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        status = self.client.get(f'/api/session_status/?session_id={self.session.id}').json()
+        self.assertEqual(status['status'], 'processing')
+        self.assertEqual(status['next_sequence'], 3)
+
+        call_command('run_prediction_worker', once=True, stdout=io.StringIO())
+        self.assertEqual(PredictionJob.objects.get().status, 'done')
+        status = self.client.get(f'/api/session_status/?session_id={self.session.id}').json()
+        self.assertEqual(status['status'], 'completed')
+        expected = InjuryRiskPredictor().predict(build_user_inputs(self.user), self.signal, 'calves')
+        self.assertEqual(status['result']['risk_level'], expected)
+
+    def test_binary_and_npy_uploads(self):
+        samples = (self.signal * 1000).astype('<i2')
+        response = self.client.post(
+            '/api/upload_emg/', samples[:2000].tobytes(), content_type='application/octet-stream',
+            headers={'X-Session-Id': str(self.session.id), 'X-EMG-Dtype': 'int16'},
+        )
+        self.assertEqual(response.status_code, 201)
+        npy = io.BytesIO()
+        np.save(npy, samples[2000:])
+        response = self.client.post(
+            f'/api/upload_emg/?session_id={self.session.id}', npy.getvalue(), content_type='application/x-npy',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.session.refresh_from_db()
+        streamed = StreamingFeatureExtractor.from_state(self.session.feature_state).finalize()
+        self.assertAlmostEqual(streamed['RMS'], extract_features(samples, fs=1000)['RMS'])
+
+    def test_incompatible_streaming_state_falls_back_to_chunks(self):
+        self.session.feature_state = {'fs': 1000, 'band_zi': [], 'notch_zi': []}
+        self.session.save()
+        response = self.client.post('/api/upload_emg/', {
+            'session_id': self.session.id, 'emg_data': self.signal.tolist(), 'sequence': 0
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.session.refresh_from_db()
+        self.assertIsNone(self.session.feature_state)
+        with override_settings(PREDICTION_WORKER='external'):
+            self.client.post('/api/end_session/', {'session_id': self.session.id}, content_type='application/json')
+        call_command('run_prediction_worker', once=True, stdout=io.StringIO())
+        self.assertEqual(PredictionJob.objects.get().status, 'done')
+
+    def test_end_session_twice_reuses_the_job(self):
+        EMGData.objects.create(user=self.user, session=self.session, raw_data=[])
+        with override_settings(PREDICTION_WORKER='external'):
+            first, second = (
+                self.client.post('/api/end_session/', {'session_id': self.session.id}, content_type='application/json')
+                for _ in range(2)
+            )
+        self.assertEqual(first.json()['job_id'], second.json()['job_id'])
+        self.assertEqual(PredictionJob.objects.count(), 1)
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = PredictionJob.objects.create(session=self.session, status='running', started_at=timezone.now())
+        self.assertIsNone(claim_next_job())
+        PredictionJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim_next_job().id, job.id)
+        self.assertIsNone(claim_next_job())
+
+    def test_rejects_non_numeric_sequence(self):
+        response = self.client.post('/api/upload_emg/', {
+            'session_id': self.session.id, 'emg_data': [0.1, 0.2], 'sequence': 'first'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_invalid_fs_and_samples(self):
+        for body in (
+            {'emg_data': [0.1, 0.2], 'fs': 'fast'},
+            {'emg_data': [0.1, 0.2], 'fs': -1},
+            {'emg_data': ['a', 0.2]},
+            {'emg_data': 'not samples'},
+        ):
+            response = self.client.post('/api/upload_emg/', dict(body, session_id=self.session.id), content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(EMGChunk.objects.exists())
+
+    def test_json_samples_are_stored_as_float64(self):
+        self.client.post('/api/upload_emg/', {
+            'session_id': self.session.id, 'emg_data': self.signal.tolist()
+        }, content_type='application/json')
+        self.assertEqual(EMGChunk.objects.get().dtype, 'float64')
+        np.testing.assert_array_equal(read_session_signal(self.session), self.signal)
+
+    def test_binary_upload_rejects_unknown_dtype(self):
+        response = self.client.post(
+            f'/api/upload_emg/?session_id={self.session.id}&dtype=uint8', b'\x00\x01',
+            content_type='application/octet-stream',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_pipeline_persists_features_and_rescore_is_idempotent(self):
+        self.client.post('/api/upload_emg/', {
+            'session_id': self.session.id, 'emg_data': self.signal.tolist()
+        }, content_type='application/json')
+        with override_settings(PREDICTION_WORKER='external'):
+            self.client.post('/api/end_session/', {'session_id': self.session.id}, content_type='application/json')
+        call_command('run_prediction_worker', once=True, stdout=io.StringIO())
+
+        feature_set = FeatureSet.objects.get()
+        self.assertEqual(feature_set.features['muscle_group'], 'calves')
+        self.assertEqual(feature_set.signal_hash, signal_key(self.signal, 1000))
+        risk_score = feature_set.risk_scores.get()
+        self.assertTrue(0.0 <= risk_score.score <= 1.0)
+        self.assertTrue(risk_score.model_version.startswith('calves:'))
+
+        out = io.StringIO()
+        call_command('rescore', stdout=out)
+        self.assertIn('Rescored 0 feature sets (1 skipped)', out.getvalue())
+        call_command('rescore', force=True, stdout=out)
+        self.assertEqual(feature_set.risk_scores.count(), 2)
+
+
+class FeatureCacheTests(TestCase):
+    def setUp(self):
+        # Whole ADC counts, so the same recording can be sent as int16 or float
+        self.signal = np.round(np.random.default_rng(5).normal(size=3000) * 1000)
+        self.cache = FeatureCache(max_entries=2, persistent=FeatureSetStore())
+
+    def test_repeated_signals_skip_dsp(self):
+        predictor = InjuryRiskPredictor(cache=self.cache)
+        expected = predictor.predict(USER_INPUTS, self.signal, 'calves')
+        with mock.patch('feature_extraction.cache.filter_signal', side_effect=AssertionError("filtered again")):
+            self.assertEqual(predictor.predict(USER_INPUTS, self.signal.astype('<i2'), 'calves'), expected)
+        self.assertEqual(signal_key(self.signal, 1000), signal_key(self.signal.tolist(), 1000.0))
+        self.assertNotEqual(signal_key(self.signal, 1000), signal_key(self.signal, 2000))
+
+        others = [self.signal * scale for scale in (2, 3)]
+        predictor.predict_batch([(USER_INPUTS, signal, 'calves') for signal in others])
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get(signal_key(self.signal, 1000)))
+
+    def test_batch_misses_share_one_store_query(self):
+        predictor = InjuryRiskPredictor(cache=FeatureCache(persistent=FeatureSetStore()))
+        items = [(USER_INPUTS, self.signal * scale, 'calves') for scale in range(1, 11)]
+        with self.assertNumQueries(1):
+            predictor.predict_batch(items)
+
+    def test_features_are_read_back_from_feature_sets(self):
+        user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="calves", contraction_type="isometric",
+        )
+        session = Session.objects.create(user=user, duration=30, device_id="esp32")
+        EMGChunk.objects.create(session=session, sequence=0, **encode_samples(self.signal))
+        EMGData.objects.create(user=user, session=session, raw_data=[])
+        run_session_prediction(session)
+        feature_set = FeatureSet.objects.get()
+        self.assertEqual(feature_set.signal_hash, signal_key(read_session_signal(session), 1000))
+
+        # A fresh process: empty memory tier, the FeatureSet answers
+        cache = FeatureCache(persistent=FeatureSetStore())
+        with mock.patch('feature_extraction.cache.filter_signal', side_effect=AssertionError("filtered again")):
+            features, _ = cache.features(read_session_signal(session), 1000)
+        self.assertEqual(features, feature_set.features['emg'])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="calves", contraction_type="isometric",
+        )
+        self.session = Session.objects.create(user=user, duration=30, device_id="esp32")
+
+    def test_server_timing_and_prometheus_endpoint(self):
+        response = self.client.post('/api/upload_emg/', {
+            'session_id': self.session.id, 'emg_data': [0.1, -0.2, 0.3] * 100
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        timing = dict(entry.split(';dur=') for entry in response['Server-Timing'].split(', '))
+        for name in ('parse', 'db_fetch', 'save', 'features', 'total'):
+            self.assertGreaterEqual(float(timing[name]), 0)
+
+        body = self.client.get('/api/metrics').content.decode()
+        self.assertIn('neurisk_http_requests_total{endpoint="api/upload_emg/",method="POST",status="201"}', body)
+        self.assertIn('neurisk_stage_duration_seconds_bucket{stage="parse",le="+Inf"}', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 401)
+        response = self.client.get('/api/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        response = self.client.get('/api/metrics/', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+
+class RequestLoggingTests(TestCase):
+    def setUp(self):
+        user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="calves", contraction_type="isometric",
+        )
+        self.session = Session.objects.create(user=user, duration=30, device_id="esp32")
+
+    @override_settings(REQUEST_LOG_SAMPLE_RATES={})
+    def test_bodies_are_summarized(self):
+        with self.assertLogs('api.requests', level='INFO') as logs:
+            self.client.post('/api/upload_emg/', {
+                'session_id': self.session.id, 'emg_data': [0.1, -0.2, 0.3] * 1000
+            }, content_type='application/json')
+        record = logs.records[0].request_log.as_dict()
+        self.assertEqual(record['endpoint'], 'api/upload_emg/')
+        self.assertEqual(record['status'], 201)
+        self.assertEqual(record['body']['emg_data'], {'type': 'list', 'length': 3000, 'item_type': 'float'})
+        self.assertLess(len(logs.output[0]), 500)
+
+        with self.assertLogs('api.requests', level='INFO') as logs:
+            self.client.post(
+                f'/api/upload_emg/?session_id={self.session.id}', np.zeros(500, dtype='<i2').tobytes(),
+                content_type='application/octet-stream', headers={'X-EMG-Dtype': 'int16'},
+            )
+        self.assertEqual(logs.records[0].request_log.as_dict()['body'], {'bytes': 1000, 'dtype': 'int16', 'samples': 500})
+
+    @override_settings(REQUEST_LOG_SAMPLE_RATES={'/api/session_status/': 0.0})
+    def test_sampled_out_requests_are_skipped_unless_they_fail(self):
+        with self.assertNoLogs('api.requests', level='INFO'):
+            self.client.get(f'/api/session_status/?session_id={self.session.id}')
+        with self.assertLogs('api.requests', level='INFO') as logs:
+            self.client.get('/api/session_status/?session_id=999999')
+        self.assertEqual(logs.records[0].request_log.as_dict()['status'], 404)
+
+
+class EMGStorageTests(TestCase):
+    def setUp(self):
+        user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="calves", contraction_type="isometric",
+        )
+        self.session = Session.objects.create(user=user, duration=30, device_id="esp32")
+
+    def test_int16_round_trip_is_exact(self):
+        samples = np.array([0, 32767, -32768, 12, -5, 32000], dtype='<i2')
+        EMGChunk.objects.create(session=self.session, sequence=0, **encode_samples(samples))
+        np.testing.assert_array_equal(read_session_signal(self.session), samples)
+
+    def test_sequence_numbers_are_enforced(self):
+        def upload(sequence, values):
+            return self.client.post('/api/upload_emg/', {
+                'session_id': self.session.id, 'sequence': sequence, 'emg_data': values
+            }, content_type='application/json')
+
+        self.assertEqual(upload(0, [0.5, -0.25]).status_code, 201)
+        self.assertEqual(upload(2, [1.0]).status_code, 409)
+        self.assertEqual(upload(1, [0.75]).status_code, 201)
+        self.assertEqual(upload(1, [0.75]).status_code, 200)
+        np.testing.assert_allclose(read_session_signal(self.session), [0.5, -0.25, 0.75])
+        self.assertEqual(EMGData.objects.filter(session=self.session).count(), 1)
+
+
+class SearchUsersTests(TestCase):
+    def setUp(self):
+        for name in ("Alice Reyes", "alvin Cruz", "Bea Santos"):
+            user = UserProfile.objects.create(
+                name=name, age=20, height=170, weight=65, training_frequency=3,
+                muscle_group="calves", contraction_type="isometric",
+            )
+            emg_data = EMGData.objects.create(user=user, raw_data=[])
+            feature_set = FeatureSet.objects.create(emg_data=emg_data, features={})
+            RiskScore.objects.create(feature_set=feature_set, score=0.9, level="high")
+        refresh_latest_risk(UserProfile.objects.values_list('id', flat=True))
+
+    def test_search_with_latest_risk_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/search_users/?query=AL')
+        results = response.json()['results']
+        self.assertEqual([user['name'] for user in results], ["Alice Reyes", "alvin Cruz"])
+        self.assertEqual({user['risk_level'] for user in results}, {"high"})
+        self.assertIsNone(response.json()['next_cursor'])
+
+    def test_matches_inside_the_name(self):
+        results = self.client.get('/api/search_users/?query=reyes').json()['results']
+        self.assertEqual([user['name'] for user in results], ["Alice Reyes"])
+
+    def test_cursor_pagination(self):
+        first = self.client.get('/api/search_users/?limit=2').json()
+        self.assertEqual(len(first['results']), 2)
+        second = self.client.get(f"/api/search_users/?limit=2&cursor={first['next_cursor']}").json()
+        self.assertEqual([user['name'] for user in second['results']], ["Bea Santos"])
+        self.assertIsNone(second['next_cursor'])
+
+
+class SessionEventsTests(TransactionTestCase):
+    def setUp(self):
+        user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="calves", contraction_type="isometric",
+        )
+        self.session = Session.objects.create(user=user, duration=30, device_id="esp32", status="processing")
+        EMGData.objects.create(user=user, session=self.session, raw_data=[])
+
+    async def _events(self, response):
+        return [chunk.decode() async for chunk in response.streaming_content]
+
+    async def test_pushes_transition_to_completed(self):
+        async def complete():
+            await asyncio.sleep(0.05)
+            await Session.objects.filter(id=self.session.id).aupdate(status="completed")
+            await EMGData.objects.filter(session=self.session).aupdate(risk_level="low")
+            notify_session(self.session.id)
+
+        response = await self.async_client.get(f'/api/session_events/?session_id={self.session.id}&timeout=5')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        completer = asyncio.ensure_future(complete())
+        events = await asyncio.wait_for(self._events(response), 2)
+        await completer
+        self.assertIn('"status": "processing"', events[0])
+        self.assertIn('"risk_level": "low"', events[-1])
+
+    async def test_unknown_session(self):
+        response = await self.async_client.get('/api/session_events/?session_id=999')
+        self.assertEqual(response.status_code, 404)
+
+
+class LiveRiskWebSocketTests(TransactionTestCase):
+    def setUp(self):
+        user = UserProfile.objects.create(
+            name="Test Athlete", age=21, height=180, weight=75, training_frequency=4,
+            muscle_group="quadriceps", contraction_type="isometric",
+        )
+        self.session = Session.objects.create(user=user, duration=30, device_id="esp32")
+
+    async def test_streams_rolling_risk(self):
+        incoming, outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/ws/live_risk/', 'query_string': f'session_id={self.session.id}'.encode()}
+        handler = asyncio.ensure_future(live_risk_websocket(scope, incoming.get, outgoing.put))
+        await incoming.put({'type': 'websocket.connect'})
+        self.assertEqual((await outgoing.get())['type'], 'websocket.accept')
+
+        samples = np.random.default_rng(5).normal(size=3000).astype('<f4')
+        for chunk in np.array_split(samples, 12):
+            await incoming.put({'type': 'websocket.receive', 'bytes': chunk.tobytes()})
+        await incoming.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(handler, 5)
+
+        messages = []
+        while not outgoing.empty():
+            messages.append(json.loads((await outgoing.get())['text']))
+        self.assertTrue(messages)
+        self.assertTrue(all(message['type'] == 'risk' for message in messages))
+        self.assertIn(messages[-1]['risk_level'], ('low', 'medium', 'high'))
+
+    async def test_skips_malformed_text_frames(self):
+        incoming, outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/ws/live_risk/', 'query_string': f'session_id={self.session.id}'.encode()}
+        handler = asyncio.ensure_future(live_risk_websocket(scope, incoming.get, outgoing.put))
+        await incoming.put({'type': 'websocket.connect'})
+        self.assertEqual((await outgoing.get())['type'], 'websocket.accept')
+
+        for text in ('[1, 2]', '3', 'not json', '{"samples": {"a": 1}}', '{"samples": [1, NaN]}'):
+            await incoming.put({'type': 'websocket.receive', 'text': text})
+        await incoming.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(handler, 5)
+
+        messages = []
+        while not outgoing.empty():
+            messages.append(json.loads((await outgoing.get())['text']))
+        self.assertEqual([message['type'] for message in messages], ['error'] * 5)
+
+    async def test_rejects_unsupported_sample_rate(self):
+        incoming, outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/ws/live_risk/', 'query_string': f'session_id={self.session.id}&fs=500'.encode()}
+        await incoming.put({'type': 'websocket.connect'})
+        await live_risk_websocket(scope, incoming.get, outgoing.put)
+        self.assertEqual(await outgoing.get(), {'type': 'websocket.close', 'code': 4400})
+
+    async def test_scoring_errors_are_reported(self):
+        incoming, outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/ws/live_risk/', 'query_string': f'session_id={self.session.id}'.encode()}
+        with mock.patch.object(InjuryRiskPredictor, 'score_from_features', side_effect=RuntimeError("model missing")):
+            handler = asyncio.ensure_future(live_risk_websocket(scope, incoming.get, outgoing.put))
+            await incoming.put({'type': 'websocket.connect'})
+            self.assertEqual((await outgoing.get())['type'], 'websocket.accept')
+            samples = np.random.default_rng(5).normal(size=3000).astype('<f4')
+            await incoming.put({'type': 'websocket.receive', 'bytes': samples.tobytes()})
+            await incoming.put({'type': 'websocket.disconnect'})
+            await asyncio.wait_for(handler, 5)
+        message = json.loads((await outgoing.get())['text'])
+        self.assertEqual(message['type'], 'error')
+        self.assertIn('model missing', message['error'])
+
+    async def test_rejects_unknown_session(self):
+        incoming, outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/ws/live_risk/', 'query_string': b'session_id=999'}
+        await incoming.put({'type': 'websocket.connect'})
+        await live_risk_websocket(scope, incoming.get, outgoing.put)
+        self.assertEqual(await outgoing.get(), {'type': 'websocket.close', 'code': 4404})
@@ -1,11 +1,14 @@
-from django.urls import path
-from .views import StartSessionView, EndSessionView, SessionStatusView, UploadEMGView, latest_session_id, search_users
+from django.urls import path, re_path
+from .views import StartSessionView, EndSessionView, SessionStatusView, UploadEMGView, PredictBatchView, session_events, latest_session_id, search_users, metrics_endpoint
 
 urlpatterns = [
     path('start_session/', StartSessionView.as_view(), name='start_session'),
     path('end_session/', EndSessionView.as_view(), name='end_session'),
     path('session_status/', SessionStatusView.as_view(), name='session_status'),
+    path('session_events/', session_events, name='session_events'),
     path('upload_emg/', UploadEMGView.as_view()),
+    path('predict_batch/', PredictBatchView.as_view(), name='predict_batch'),
     path('latest_session_id/', latest_session_id, name='latest_session_id'),
     path('search_users/', search_users, name='search_users'),
+    re_path(r'^metrics/?$', metrics_endpoint, name='metrics'),
 ]
\ No newline at end of file
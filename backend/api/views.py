@@ -2,32 +2,88 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view
+from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+from rest_framework.exceptions import ParseError
 import logging
 import json
 import uuid
+import asyncio
+import hmac
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.db import transaction
 from django.conf import settings
 from prediction.predictor import InjuryRiskPredictor
+from feature_extraction.streaming import StreamingFeatureExtractor
+import metrics
+from metrics import stage
 
-from .models import UserProfile, Session, EMGData
+from .models import UserProfile, Session, EMGData, EMGChunk
+from .emg_storage import encode_samples, read_session_signals
+from .jobs import build_user_inputs, enqueue_prediction
 from .serializers import UserProfileSerializer
+from .parsers import EMGBinaryParser, NpyParser
+from .events import SessionWatch, notify_session
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Longest a status stream stays open before the client has to reconnect
+SESSION_EVENTS_TIMEOUT = 120
+
+def parse_sample_rate(value, default=1000):
+    """A request's ``fs`` as a positive, finite float; raises ValueError otherwise."""
+    if value is None or value == '':
+        return float(default)
+    try:
+        fs = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid sample rate {value!r}")
+    if not np.isfinite(fs) or fs <= 0:
+        raise ValueError(f"Invalid sample rate {value!r}")
+    return fs
+
+def parse_samples(emg_data):
+    """``emg_data`` as a numeric array; raises ValueError unless every sample is a finite number."""
+    try:
+        samples = emg_data if isinstance(emg_data, np.ndarray) else np.asarray(emg_data, dtype=float)
+    except (TypeError, ValueError):
+        samples = None
+    if samples is None or samples.dtype.kind not in 'iuf':
+        raise ValueError("emg_data must be a list of numbers")
+    if samples.dtype.kind == 'f' and not np.isfinite(samples).all():
+        raise ValueError("emg_data must not contain NaN or infinity")
+    return samples
+
+def session_status_payload(session):
+    """Status, result and (for failed sessions) the job error, as returned by session_status."""
+    if session.status == "completed":
+        emg_obj = EMGData.objects.filter(session=session).last()
+        risk_level = getattr(emg_obj, "risk_level", None)
+        result = {
+            "risk_level": risk_level or "medium"
+        }
+    else:
+        result = None
+    payload = {
+        'status': session.status,
+        'result': result
+    }
+    if session.status == "failed":
+        job = session.prediction_jobs.order_by('-id').first()
+        if job and job.error:
+            payload['error'] = job.error
+    return payload
+
 class StartSessionView(APIView):
     def post(self, request, format=None):
         try:
-            logger.info(f"Received POST request to start_session")
-            logger.info(f"Request data: {json.dumps(request.data, default=str)}")
-            
             user_data = request.data.get('user')
             duration = request.data.get('duration')
             device_id = request.data.get('device_id')
             
-            logger.info(f"Extracted data - user: {user_data}, duration: {duration}, device_id: {device_id}")
-            
             if not user_data:
                 logger.warning("Missing user data in request")
                 return Response({'error': 'user data is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -46,15 +102,15 @@ class StartSessionView(APIView):
                     user_serializer = UserProfileSerializer(data=user_data)
                     if user_serializer.is_valid():
                         user = user_serializer.save()
-                        logger.info(f"User created/updated successfully with ID: {user.id}")
+                        logger.info("User created/updated successfully with ID: %s", user.id)
                     else:
-                        logger.error(f"User serializer validation failed: {user_serializer.errors}")
+                        logger.error("User serializer validation failed: %s", user_serializer.errors)
                         return Response({
                             'error': 'Invalid user data',
                             'details': user_serializer.errors
                         }, status=status.HTTP_400_BAD_REQUEST)
                 except Exception as e:
-                    logger.error(f"Error processing user data: {str(e)}")
+                    logger.error("Error processing user data: %s", e)
                     return Response({
                         'error': 'Error processing user data',
                         'message': str(e)
@@ -63,9 +119,9 @@ class StartSessionView(APIView):
                 # Deactivate previous sessions for this device
                 try:
                     Session.objects.filter(device_id=device_id, is_active=True).update(is_active=False)
-                    logger.info(f"Deactivated previous sessions for device: {device_id}")
+                    logger.info("Deactivated previous sessions for device: %s", device_id)
                 except Exception as e:
-                    logger.error(f"Error deactivating previous sessions: {str(e)}")
+                    logger.error("Error deactivating previous sessions: %s", e)
                 
                 # Create new session
                 try:
@@ -77,10 +133,10 @@ class StartSessionView(APIView):
                         is_active=True,
                         created_at=timezone.now()
                     )
-                    logger.info(f"Session created successfully with ID: {session.id}")
+                    logger.info("Session created successfully with ID: %s", session.id)
                     session_id = session.id
                 except Exception as e:
-                    logger.error(f"Error creating session: {str(e)}")
+                    logger.error("Error creating session: %s", e)
                     return Response({
                         'error': 'Error creating session',
                         'message': str(e)
@@ -89,7 +145,7 @@ class StartSessionView(APIView):
             return Response({'session_id': session_id}, status=status.HTTP_201_CREATED)
             
         except Exception as e:
-            logger.error(f"Unexpected error in StartSessionView: {str(e)}")
+            logger.error("Unexpected error in StartSessionView: %s", e)
             return Response({
                 'error': 'Internal server error',
                 'message': str(e)
@@ -98,9 +154,6 @@ class StartSessionView(APIView):
 class EndSessionView(APIView):
     def post(self, request, format=None):
         try:
-            logger.info(f"Received POST request to end_session")
-            logger.info(f"Request data: {json.dumps(request.data, default=str)}")
-            
             session_id = request.data.get('session_id')
             fs = request.data.get('fs', 1000)  # Default to 1000 if not provided
             
@@ -109,69 +162,52 @@ class EndSessionView(APIView):
                 return Response({'error': 'session_id is required'}, status=status.HTTP_400_BAD_REQUEST)
             
             try:
-                session = Session.objects.filter(id=session_id).first()
+                with stage("db_fetch"):
+                    session = Session.objects.filter(id=session_id).first()
                 if not session:
-                    logger.warning(f"Session not found: {session_id}")
+                    logger.warning("Session not found: %s", session_id)
                     return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
                 
                 session.is_active = False
                 session.status = 'processing'
                 session.ended_at = timezone.now()
-                session.save()
-                logger.info(f"Session {session_id} marked as ended and processing")
+                with stage("save"):
+                    session.save()
+                logger.info("Session %s marked as ended and processing", session_id)
             except Exception as e:
-                logger.error(f"Error updating session: {str(e)}")
+                logger.error("Error updating session: %s", e)
                 return Response({
                     'error': 'Error updating session',
                     'message': str(e)
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Prediction logic
+            # Prediction runs in the background; clients poll session_status for the result
             try:
-                emg_obj = EMGData.objects.filter(session=session).last()
-                if not emg_obj:
-                    logger.warning(f"No EMG data found for session: {session_id}")
+                with stage("db_fetch"):
+                    has_emg = EMGData.objects.filter(session=session).exists()
+                if not has_emg:
+                    logger.warning("No EMG data found for session: %s", session_id)
                     return Response({'error': 'No EMG data found for this session'}, status=status.HTTP_400_BAD_REQUEST)
                 
-                emg_signal = emg_obj.raw_data
-                user = session.user
-                user_inputs = {
-                    "age": user.age,
-                    "height": user.height,
-                    "weight": user.weight,
-                    "bmi": user.weight / ((user.height / 100) ** 2),
-                    "training_frequency": user.training_frequency,
-                    "previous_injury": user.previous_injury,
-                    "contraction_type": user.contraction_type,
-                }
-                muscle_group = user.muscle_group
-                
-                predictor = InjuryRiskPredictor()
-                risk_level = predictor.predict(user_inputs, emg_signal, muscle_group)
-
-                # Save risk_level to EMGData
-                emg_obj.risk_level = risk_level
-                emg_obj.save()
-                
-                session.status = "completed"
-                session.save()
-                
-                logger.info(f"Session {session_id} processed with risk level: {risk_level}")
+                with stage("enqueue"):
+                    job = enqueue_prediction(session, fs=fs)
+                logger.info("Session %s queued for prediction as job %s", session_id, job.id)
+                notify_session(session.id)
                 
                 return Response({
                     "session_id": session_id,
-                    "risk_level": risk_level,
-                    "status": "completed"
-                }, status=status.HTTP_200_OK)
+                    "job_id": job.id,
+                    "status": "processing"
+                }, status=status.HTTP_202_ACCEPTED)
             except Exception as e:
-                logger.error(f"Error in prediction pipeline: {str(e)}")
+                logger.error("Error queueing prediction: %s", e)
                 return Response({
-                    'error': 'Error in prediction pipeline',
+                    'error': 'Error queueing prediction',
                     'message': str(e)
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
         except Exception as e:
-            logger.error(f"Unexpected error in EndSessionView: {str(e)}")
+            logger.error("Unexpected error in EndSessionView: %s", e)
             return Response({
                 'error': 'Internal server error',
                 'message': str(e)
@@ -180,9 +216,6 @@ class EndSessionView(APIView):
 class SessionStatusView(APIView):
     def get(self, request, format=None):
         try:
-            logger.info(f"Received GET request to session_status")
-            logger.info(f"Query params: {request.query_params}")
-            
             session_id = request.query_params.get('session_id')
             
             if not session_id:
@@ -192,47 +225,100 @@ class SessionStatusView(APIView):
             try:
                 session = Session.objects.filter(id=session_id).first()
                 if not session:
-                    logger.warning(f"Session not found: {session_id}")
+                    logger.warning("Session not found: %s", session_id)
                     return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
                 
-                if session.status == "completed":
-                    emg_obj = EMGData.objects.filter(session=session).last()
-                    risk_level = getattr(emg_obj, "risk_level", None)
-                    result = {
-                        "risk_level": risk_level or "medium"
-                    }
-                else:
-                    result = None
-                    
-                logger.info(f"Retrieved status for session {session_id}: {session.status}")
+                logger.info("Retrieved status for session %s: %s", session_id, session.status)
                 
-                return Response({
-                    'session_id': session_id,
-                    'status': session.status,
-                    'result': result
-                }, status=status.HTTP_200_OK)
+                response_data = {'session_id': session_id}
+                response_data.update(session_status_payload(session))
+                # Lets a client resuming uploads into this session continue the chunk sequence
+                response_data['next_sequence'] = EMGChunk.objects.filter(session=session).count()
+                return Response(response_data, status=status.HTTP_200_OK)
             except Exception as e:
-                logger.error(f"Error retrieving session: {str(e)}")
+                logger.error("Error retrieving session: %s", e)
                 return Response({
                     'error': 'Error retrieving session',
                     'message': str(e)
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
         except Exception as e:
-            logger.error(f"Unexpected error in SessionStatusView: {str(e)}")
+            logger.error("Unexpected error in SessionStatusView: %s", e)
             return Response({
                 'error': 'Internal server error',
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def session_events(request):
+    """Server-Sent Events stream of a session's status, served through backend/asgi.py.
+
+    Sends the current status immediately, then one event per transition
+    until the session is completed or failed (the final event carries the
+    risk level), or until ``timeout`` seconds pass. Transitions made by this
+    process's prediction worker are pushed as they happen; the database is
+    also re-checked every SESSION_EVENTS_POLL_INTERVAL seconds for jobs run
+    elsewhere.
+    """
+    session_id = request.GET.get('session_id')
+    if not session_id or not session_id.isdigit():
+        return JsonResponse({'error': 'session_id is required'}, status=400)
+    try:
+        timeout = min(float(request.GET.get('timeout', SESSION_EVENTS_TIMEOUT)), SESSION_EVENTS_TIMEOUT)
+    except ValueError:
+        return JsonResponse({'error': 'timeout must be a number'}, status=400)
+
+    def current_status():
+        session = Session.objects.filter(id=session_id).first()
+        return None if session is None else session_status_payload(session)
+
+    payload = await sync_to_async(current_status)()
+    if payload is None:
+        return JsonResponse({'error': 'Session not found'}, status=404)
+
+    async def stream(payload):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with SessionWatch(session_id) as watch:
+            # Re-read once subscribed so a transition right before subscribing is not missed
+            payload = await sync_to_async(current_status)() or payload
+            yield _sse_event('status', dict(payload, session_id=int(session_id)))
+            while payload['status'] not in ('completed', 'failed'):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    yield _sse_event('timeout', {'session_id': int(session_id)})
+                    return
+                notified = await watch.wait(min(remaining, settings.SESSION_EVENTS_POLL_INTERVAL))
+                latest = await sync_to_async(current_status)()
+                if latest is None:
+                    return
+                if latest != payload:
+                    payload = latest
+                    yield _sse_event('status', dict(payload, session_id=int(session_id)))
+                elif not notified:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+
+    response = StreamingHttpResponse(stream(payload), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 class UploadEMGView(APIView):
+    # JSON/form bodies with an emg_data list, or raw binary sample buffers
+    parser_classes = [JSONParser, FormParser, MultiPartParser, EMGBinaryParser, NpyParser]
+
     def post(self, request, format=None):
         try:
-            session_id = request.data.get("session_id")
-            emg_data = request.data.get("emg_data")
+            with stage("parse"):
+                session_id = request.data.get("session_id")
+                emg_data = request.data.get("emg_data")
             if not session_id or emg_data is None:
                 return Response({"error": "Missing session_id or emg_data"}, status=status.HTTP_400_BAD_REQUEST)
-            session = Session.objects.filter(id=session_id).first()
+            with stage("db_fetch"):
+                session = Session.objects.filter(id=session_id).first()
             if not session:
                 return Response({"error": "Session not found"}, status=status.HTTP_404_NOT_FOUND)
             if not session.is_active:
@@ -244,16 +330,144 @@ class UploadEMGView(APIView):
                 if elapsed > session.duration:
                     return Response({"error": "Session duration has ended"}, status=status.HTTP_403_FORBIDDEN)
             user = session.user
-            # Save EMG data
-            EMGData.objects.create(
-                user=user,
-                session=session,
-                raw_data=emg_data
-            )
-            return Response({"message": "EMG data uploaded successfully"}, status=status.HTTP_201_CREATED)
+            try:
+                fs = parse_sample_rate(request.data.get("fs"))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            sequence = request.data.get("sequence")
+            if sequence is not None:
+                try:
+                    sequence = int(sequence)
+                except (TypeError, ValueError):
+                    return Response({"error": "sequence must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                with stage("decode"):
+                    samples = parse_samples(emg_data)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                # The row lock serializes uploads for the same session, so chunk
+                # sequence numbers and the streaming filter state stay consistent
+                session = Session.objects.select_for_update().get(id=session.id)
+                next_sequence = EMGChunk.objects.filter(session=session).count()
+                sequence = next_sequence if sequence is None else sequence
+                if sequence < next_sequence:
+                    # Retried chunk that was already stored
+                    return Response({"message": "EMG chunk already received", "sequence": sequence}, status=status.HTTP_200_OK)
+                if sequence > next_sequence:
+                    return Response({
+                        "error": "EMG chunk out of order",
+                        "expected_sequence": next_sequence
+                    }, status=status.HTTP_409_CONFLICT)
+
+                # Save EMG data
+                with stage("save"):
+                    EMGChunk.objects.create(session=session, sequence=sequence, **encode_samples(samples))
+                    if not EMGData.objects.filter(session=session).exists():
+                        # Samples live in EMGChunk; this row carries the session's risk result
+                        EMGData.objects.create(user=user, session=session, raw_data=[])
+
+                # Fold the chunk into the session's running features. A session
+                # whose state can't be resumed drops it, and end_session then
+                # extracts features from the stored chunks instead.
+                extractor = None
+                if session.feature_state:
+                    try:
+                        extractor = StreamingFeatureExtractor.from_state(session.feature_state)
+                    except (KeyError, ValueError):
+                        logger.warning("Discarding incompatible streaming state for session %s", session.id)
+                elif sequence == 0:
+                    extractor = StreamingFeatureExtractor(fs)
+                if extractor is not None:
+                    with stage("features"):
+                        extractor.update(samples)
+                    session.feature_state = extractor.to_state()
+                    session.save(update_fields=["feature_state"])
+                elif session.feature_state is not None:
+                    session.feature_state = None
+                    session.save(update_fields=["feature_state"])
+            return Response({"message": "EMG data uploaded successfully", "sequence": sequence}, status=status.HTTP_201_CREATED)
+        except ParseError as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class PredictBatchView(APIView):
+    """Score many sessions or raw signals in one request.
+
+    Each item is either ``{"session_id": ...}`` (scores the session's stored
+    EMG data) or ``{"user_inputs": {...}, "emg_data": [...], "muscle_group": ...}``.
+    """
+    def post(self, request, format=None):
+        try:
+            items = request.data.get('items')
+            try:
+                fs = parse_sample_rate(request.data.get('fs'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if not isinstance(items, list) or not items:
+                return Response({'error': 'items must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+            session_ids = []
+            for index, item in enumerate(items):
+                if isinstance(item, dict) and item.get('session_id'):
+                    try:
+                        session_ids.append(int(item['session_id']))
+                    except (TypeError, ValueError):
+                        return Response({'error': f'Item {index}: session_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            with stage("db_fetch"):
+                sessions = Session.objects.filter(id__in=session_ids).select_related('user').in_bulk()
+            with stage("decode"):
+                signals = read_session_signals(list(sessions.keys()))
+
+            batch = []
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    return Response({'error': f'Item {index} must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+                session_id = item.get('session_id')
+                if session_id:
+                    session = sessions.get(int(session_id))
+                    if not session:
+                        return Response({'error': f'Session not found: {session_id}'}, status=status.HTTP_404_NOT_FOUND)
+                    emg_signal = signals.get(session.id)
+                    if emg_signal is None:
+                        return Response({'error': f'No EMG data found for session: {session_id}'}, status=status.HTTP_400_BAD_REQUEST)
+                    batch.append((build_user_inputs(session.user), emg_signal, session.user.muscle_group))
+                else:
+                    user_inputs = item.get('user_inputs')
+                    emg_data = item.get('emg_data')
+                    muscle_group = item.get('muscle_group')
+                    if not isinstance(user_inputs, dict) or emg_data is None or not muscle_group:
+                        return Response({
+                            'error': f'Item {index} needs session_id or user_inputs, emg_data and muscle_group'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+                    try:
+                        emg_data = parse_samples(emg_data)
+                    except ValueError as e:
+                        return Response({'error': f'Item {index}: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+                    batch.append((user_inputs, emg_data, muscle_group))
+
+            predictor = InjuryRiskPredictor()
+            try:
+                risk_levels = predictor.predict_batch(batch, fs=fs)
+            except KeyError as e:
+                return Response({'error': f'Unknown muscle group: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+            results = []
+            for item, risk_level in zip(items, risk_levels):
+                result = {'risk_level': risk_level}
+                if item.get('session_id'):
+                    result['session_id'] = item['session_id']
+                results.append(result)
+            logger.info("Scored batch of %s items", len(results))
+            return Response({'results': results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error("Unexpected error in PredictBatchView: %s", e)
+            return Response({
+                'error': 'Internal server error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 def latest_session_id(request):
     device_id = request.GET.get('device_id')
@@ -265,27 +479,56 @@ def latest_session_id(request):
     else:
         return Response({'error': 'No active session found for this device'}, status=404)
 
+SEARCH_MAX_PAGE_SIZE = 200
+
 @api_view(['GET'])
 def search_users(request):
-    query = request.GET.get('query', '')
-    users = UserProfile.objects.filter(name__icontains=query) if query else UserProfile.objects.all()
-    results = []
-    for user in users:
-        # Get the latest EMGData for this user (if any)
-        emg = EMGData.objects.filter(user=user).order_by('-timestamp').first()
-        risk_level = None
-        if emg:
-            # Get the latest FeatureSet for this EMGData
-            feature_set = emg.feature_sets.order_by('-timestamp').first()
-            if feature_set:
-                # Get the latest RiskScore for this FeatureSet
-                risk_score = feature_set.risk_scores.order_by('-timestamp').first()
-                if risk_score:
-                    risk_level = risk_score.level
-        results.append({
-            "id": user.id,
-            "name": user.name,
-            "age": user.age,
-            "risk_level": risk_level,
-        })
-    return Response({"results": results})
\ No newline at end of file
+    """Case-insensitive name substring search with the latest risk level per user.
+
+    Pagination is opt-in: pass ``limit`` to get at most that many users and
+    a ``next_cursor``, then pass it back as ``cursor`` for the next page.
+    Without ``limit`` every match is returned. One query per page.
+    """
+    query = request.GET.get('query', '').strip().lower()
+    paginate = 'limit' in request.GET or 'cursor' in request.GET
+    try:
+        limit = min(int(request.GET.get('limit', SEARCH_MAX_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE)
+        cursor = int(request.GET.get('cursor', 0))
+    except ValueError:
+        return Response({'error': 'limit and cursor must be integers'}, status=400)
+    if limit < 1:
+        return Response({'error': 'limit must be positive'}, status=400)
+
+    users = UserProfile.objects.all()
+    if query:
+        # Lowercase name column backed by a trigram index on PostgreSQL
+        users = users.filter(search_name__contains=query)
+    if cursor:
+        users = users.filter(id__gt=cursor)
+    users = users.order_by('id').values('id', 'name', 'age', 'latest_risk_level')
+    next_cursor = None
+    if paginate:
+        page = list(users[:limit + 1])
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = page[-1]['id']
+    else:
+        page = list(users)
+    results = [{
+        "id": user['id'],
+        "name": user['name'],
+        "age": user['age'],
+        "risk_level": user['latest_risk_level'],
+    } for user in page]
+    return Response({"results": results, "next_cursor": next_cursor})
+
+def metrics_endpoint(request):
+    """Prometheus scrape endpoint for this process's request and stage metrics.
+
+    When settings.METRICS_TOKEN is set, scrapers must send
+    ``Authorization: Bearer <token>``.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -3,6 +3,11 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Streaming endpoints such as /api/session_events/ and the /ws/live_risk/
+WebSocket need an ASGI server, e.g. ``uvicorn backend.asgi:application``;
+under WSGI the event stream holds a worker for its whole life and the
+WebSocket is unavailable.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +17,18 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Load the prediction models at startup rather than on the first request
+os.environ.setdefault('PRELOAD_MODELS', 'True')
+
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from api.live import live_risk_websocket  # noqa: E402
+
 
-application = get_asgi_application()
+async def application(scope, receive, send):
+    # WebSockets (live risk streaming) bypass Django, which only speaks HTTP
+    if scope['type'] == 'websocket':
+        await live_risk_websocket(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -19,6 +19,36 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Use environment variables for sensitive settings
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "unsafe-secret-key")
 DEBUG = os.environ.get("DJANGO_DEBUG", "False") == "True"
+# Load the per-muscle models once per worker at startup instead of on the first request.
+# Off by default so manage.py commands (migrate, test, ...) don't load them;
+# gunicorn.conf.py and backend/asgi.py turn it on for the servers
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "False") == "True"
+# "pickle": the sklearn pickles in backend/models
+# "compiled": the memory-mapped artifacts from `manage.py export_models`, shared by all workers
+MODEL_ARTIFACTS = os.environ.get("MODEL_ARTIFACTS", "pickle")
+# "thread": end_session jobs run on an in-process thread pool
+# "external": jobs wait in the PredictionJob table for `manage.py run_prediction_worker`
+PREDICTION_WORKER = os.environ.get("PREDICTION_WORKER", "thread")
+PREDICTION_WORKER_THREADS = int(os.environ.get("PREDICTION_WORKER_THREADS", "2"))
+# Seconds after which a running job is assumed to belong to a dead worker and is claimed again
+PREDICTION_JOB_TIMEOUT = float(os.environ.get("PREDICTION_JOB_TIMEOUT", "600"))
+# How often /api/session_events/ re-checks the database for jobs finished by another process
+SESSION_EVENTS_POLL_INTERVAL = float(os.environ.get("SESSION_EVENTS_POLL_INTERVAL", "5"))
+# Sliding window used by the /ws/live_risk/ WebSocket
+LIVE_RISK_WINDOW_SECONDS = float(os.environ.get("LIVE_RISK_WINDOW_SECONDS", "2.0"))
+LIVE_RISK_HOP_SECONDS = float(os.environ.get("LIVE_RISK_HOP_SECONDS", "0.25"))
+# Per-stage timings in a Server-Timing response header
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "True") == "True"
+# When set, /api/metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Request log ("api.requests"): fraction of requests logged per path; errors and slow requests are always logged
+REQUEST_LOG_SAMPLE_RATES = {
+    '/api/upload_emg/': float(os.environ.get("REQUEST_LOG_UPLOAD_SAMPLE_RATE", "0.01")),
+    '/api/session_status/': float(os.environ.get("REQUEST_LOG_STATUS_SAMPLE_RATE", "0.1")),
+}
+REQUEST_LOG_SLOW_MS = int(os.environ.get("REQUEST_LOG_SLOW_MS", "1000"))
+# Larger JSON bodies are logged by size only, never read for the log
+REQUEST_LOG_MAX_BODY_BYTES = int(os.environ.get("REQUEST_LOG_MAX_BODY_BYTES", "65536"))
 ALLOWED_HOSTS = [
     'neurisk-backend.onrender.com',
     'localhost',
@@ -53,6 +83,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.RequestLoggingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -87,6 +119,8 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 # Database: Use dj-database-url for Render
+# On PostgreSQL, migration 0012 creates the pg_trgm extension for the user-search
+# index; that needs a role allowed to CREATE EXTENSION, otherwise the index is skipped
 import dj_database_url
 DATABASES = {
     'default': dj_database_url.config(default=os.environ.get("DATABASE_URL"))
@@ -165,6 +199,10 @@ CORS_ALLOWED_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-session-id',
+    'x-emg-dtype',
+    'x-sample-rate',
+    'x-chunk-sequence',
 ]
 
 CORS_ALLOW_METHODS = [
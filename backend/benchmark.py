@@ -0,0 +1,248 @@
+"""Offline performance benchmarks for the feature, predict and API paths.
+
+    python benchmark.py                                  # writes benchmark_results.json
+    python benchmark.py --output run.json --compare benchmark_results.json
+
+Runs against a throwaway SQLite database and the models in backend/models,
+so no network or Postgres is needed. Every case reports min/median/p95/mean
+milliseconds; ``--compare`` prints the median ratio against an earlier run
+and exits with status 1 if any case slowed down by more than ``--threshold``.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+USER = {
+    "name": "Benchmark Athlete", "age": 22, "height": 178, "weight": 72, "training_frequency": 4,
+    "previous_injury": "none", "muscle_group": "calves", "contraction_type": "isometric",
+}
+USER_INPUTS = {
+    "age": 22, "height": 178, "weight": 72, "bmi": 72 / 1.78 ** 2, "training_frequency": 4,
+    "previous_injury": "none", "contraction_type": "isometric",
+}
+
+
+def setup_django(db_path):
+    # Forced rather than defaulted, so a DATABASE_URL in the shell can't point the run at a real database
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['PRELOAD_MODELS'] = 'False'
+    os.environ['PREDICTION_WORKER'] = 'external'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def quiet_logging():
+    # Log records are still formatted and emitted, just not printed
+    devnull = open(os.devnull, 'w')
+    for logger in [logging.getLogger()] + [logging.getLogger(name) for name in logging.root.manager.loggerDict]:
+        for handler in getattr(logger, 'handlers', []):
+            if isinstance(handler, logging.StreamHandler):
+                handler.setStream(devnull)
+
+
+def timed(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'n': repeat,
+        'min_ms': samples[0],
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        'mean_ms': statistics.fmean(samples),
+    }
+
+
+def bench_extract_features(repeat):
+    from feature_extraction.emg_features import extract_features
+    rng = np.random.default_rng(0)
+    results = {}
+    # The 20-450 Hz band needs fs above 900 Hz
+    for fs in (1000, 2000, 4000):
+        for seconds in (1, 10, 60):
+            signal = rng.normal(size=int(fs * seconds))
+            results[f'fs={fs},seconds={seconds}'] = timed(lambda: extract_features(signal, fs), repeat)
+    return results
+
+
+def bench_predictor(repeat):
+    from feature_extraction.emg_features import extract_features
+    from prediction.predictor import InjuryRiskPredictor
+    from prediction.registry import ModelRegistry
+    features = extract_features(np.random.default_rng(1).normal(size=5000), 1000)
+    results = {}
+    for compiled in (False, True):
+        label = 'compiled' if compiled else 'sklearn'
+
+        def cold():
+            # Fresh registry: unpickle (and compile) the model, then score once
+            InjuryRiskPredictor(ModelRegistry(), compiled=compiled).score_from_features(USER_INPUTS, features, 'calves')
+        results[f'{label}/cold'] = timed(cold, max(3, repeat // 10), warmup=0)
+
+        predictor = InjuryRiskPredictor(ModelRegistry(), compiled=compiled)
+        results[f'{label}/warm'] = timed(lambda: predictor.score_from_features(USER_INPUTS, features, 'calves'), repeat)
+        batch = [(USER_INPUTS, features, muscle) for muscle in ('calves', 'hamstrings', 'quadriceps')] * 32
+        results[f'{label}/warm_batch_96'] = timed(lambda: predictor.score_features_batch(batch), max(3, repeat // 5))
+    return results
+
+
+def bench_upload_parse(repeat):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from api.parsers import EMGBinaryParser, NpyParser
+    factory = APIRequestFactory()
+    parsers = [JSONParser(), EMGBinaryParser(), NpyParser()]
+    rng = np.random.default_rng(2)
+    results = {}
+    for n_samples in (1000, 10000, 100000):
+        samples = rng.normal(size=n_samples)
+        npy = io.BytesIO()
+        np.save(npy, samples.astype('<f4'))
+        bodies = {
+            'json': (json.dumps({'session_id': 1, 'emg_data': samples.tolist()}), 'application/json', {}),
+            'int16': ((samples * 1000).astype('<i2').tobytes(), 'application/octet-stream', {'HTTP_X_EMG_DTYPE': 'int16'}),
+            'float32': (samples.astype('<f4').tobytes(), 'application/octet-stream', {'HTTP_X_EMG_DTYPE': 'float32'}),
+            'npy': (npy.getvalue(), 'application/x-npy', {}),
+        }
+        for name, (body, content_type, headers) in bodies.items():
+            def parse():
+                request = Request(factory.post('/api/upload_emg/?session_id=1', body, content_type=content_type, **headers), parsers=parsers)
+                # The view turns JSON lists into an array the same way
+                np.asarray(request.data['emg_data'], dtype=float)
+            results[f'{name}/samples={n_samples}'] = timed(parse, repeat)
+    return results
+
+
+def bench_session_flow(repeat, chunks=10, chunk_samples=1000):
+    from django.test import Client
+    from api.jobs import claim_next_job, run_job
+    client = Client(HTTP_HOST='localhost')
+    rng = np.random.default_rng(3)
+    stages = {name: [] for name in ('start_session', 'upload_emg', 'end_session', 'prediction_job', 'session_status', 'total')}
+
+    def clock(stage, fn):
+        start = time.perf_counter()
+        result = fn()
+        stages[stage].append((time.perf_counter() - start) * 1000)
+        return result
+
+    for _ in range(repeat + 1):
+        flow_start = time.perf_counter()
+        response = clock('start_session', lambda: client.post('/api/start_session/', {
+            'user': USER, 'duration': 60, 'device_id': 'bench-esp32'
+        }, content_type='application/json'))
+        session_id = response.json()['session_id']
+        for sequence in range(chunks):
+            body = (rng.normal(size=chunk_samples) * 1000).astype('<i2').tobytes()
+            response = clock('upload_emg', lambda: client.post(
+                '/api/upload_emg/', body, content_type='application/octet-stream',
+                headers={'X-Session-Id': str(session_id), 'X-EMG-Dtype': 'int16', 'X-Chunk-Sequence': str(sequence)},
+            ))
+            assert response.status_code == 201, response.content
+        clock('end_session', lambda: client.post('/api/end_session/', {'session_id': session_id}, content_type='application/json'))
+        clock('prediction_job', lambda: run_job(claim_next_job()))
+        response = clock('session_status', lambda: client.get(f'/api/session_status/?session_id={session_id}'))
+        assert response.json()['status'] == 'completed', response.content
+        stages['total'].append((time.perf_counter() - flow_start) * 1000)
+
+    results = {}
+    for stage, samples in stages.items():
+        # The first flow pays for model loading and is reported separately
+        per_flow = len(samples) // (repeat + 1)
+        first, rest = samples[:per_flow], sorted(samples[per_flow:])
+        results[stage] = {
+            'n': len(rest),
+            'first_ms': sum(first),
+            'min_ms': rest[0],
+            'median_ms': statistics.median(rest),
+            'p95_ms': rest[min(len(rest) - 1, int(round(0.95 * (len(rest) - 1))))],
+            'mean_ms': statistics.fmean(rest),
+        }
+    return results
+
+
+SUITES = {
+    'extract_features': bench_extract_features,
+    'predictor': bench_predictor,
+    'upload_parse': bench_upload_parse,
+    'session_flow': bench_session_flow,
+}
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for suite, cases in results['suites'].items():
+        for case, stats in cases.items():
+            old = baseline.get('suites', {}).get(suite, {}).get(case)
+            if not old or not old.get('median_ms'):
+                continue
+            ratio = stats['median_ms'] / old['median_ms']
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  REGRESSION'
+                regressions.append(f'{suite}/{case}')
+            print(f"{suite}/{case:<36} {old['median_ms']:10.3f} -> {stats['median_ms']:10.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--repeat', type=int, default=50, help="Timed runs per case")
+    parser.add_argument('--suite', action='append', choices=list(SUITES), help="Run only these suites")
+    parser.add_argument('--compare', help="Earlier results JSON to compare medians against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed median slowdown before failing, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+    # Pickles saved by a slightly different scikit-learn warn on every load
+    warnings.filterwarnings('ignore', message='Trying to unpickle estimator')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(os.path.join(tmp_dir, 'benchmark.sqlite3'))
+        quiet_logging()
+        results = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'suites': {},
+        }
+        for name in args.suite or SUITES:
+            print(f"Running {name}...", file=sys.stderr)
+            results['suites'][name] = SUITES[name](args.repeat)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
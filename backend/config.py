@@ -17,6 +17,10 @@ CROSS_VALIDATION_FOLDS = 5
 FILTER_LOW_CUTOFF = 20  # Low cutoff frequency for bandpass filter
 FILTER_HIGH_CUTOFF = 450  # High cutoff frequency for bandpass filter
 NOTCH_FREQ = 60  # Frequency to be removed by notch filter
+FILTER_ORDER = 5  # Butterworth order of the bandpass filter
+NOTCH_QUALITY_FACTOR = 30  # Notch bandwidth is NOTCH_FREQ / NOTCH_QUALITY_FACTOR
+FILTER_ZERO_PHASE = False  # Filter forwards and backwards in offline feature extraction
+FEATURE_CACHE_SIZE = 256  # Feature sets kept in memory per process, keyed by signal content
 
 # Synthetic data generation parameters
 SYNTHETIC_DATA_SIZE = 1000  # Number of synthetic samples to generate
@@ -32,4 +36,11 @@ MODEL_PATHS = {
     'calves': os.path.join(MODEL_SAVE_PATH, 'model_calves.pkl'),
     'hamstrings': os.path.join(MODEL_SAVE_PATH, 'model_hamstrings.pkl'),
     'quadriceps': os.path.join(MODEL_SAVE_PATH, 'model_quadriceps.pkl'),
-}
\ No newline at end of file
+}
+
+# NumPy-only, memory-mappable artifacts written by `manage.py export_models`
+COMPILED_MODEL_PATHS = {
+    'calves': os.path.join(MODEL_SAVE_PATH, 'model_calves.compiled.joblib'),
+    'hamstrings': os.path.join(MODEL_SAVE_PATH, 'model_hamstrings.compiled.joblib'),
+    'quadriceps': os.path.join(MODEL_SAVE_PATH, 'model_quadriceps.compiled.joblib'),
+}
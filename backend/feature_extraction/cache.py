@@ -0,0 +1,138 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from config import (
+    FEATURE_CACHE_SIZE, FILTER_HIGH_CUTOFF, FILTER_LOW_CUTOFF, FILTER_ORDER, FILTER_ZERO_PHASE,
+    NOTCH_FREQ, NOTCH_QUALITY_FACTOR,
+)
+import metrics
+from feature_extraction.emg_features import extract_features_batch, filter_signal, time_domain_features
+from metrics import stage
+
+# Bump when the feature code changes in a way that changes results; the
+# filter settings are part of the key already
+FEATURE_EXTRACTOR_VERSION = 1
+
+
+def extractor_version():
+    return (f"td{FEATURE_EXTRACTOR_VERSION}:{FILTER_LOW_CUTOFF}-{FILTER_HIGH_CUTOFF}:"
+            f"notch{NOTCH_FREQ}q{NOTCH_QUALITY_FACTOR}:o{FILTER_ORDER}:{'zp' if FILTER_ZERO_PHASE else 'causal'}")
+
+
+def signal_key(emg_signal, fs):
+    """Content hash of a 1-D signal, its sample rate and the extractor version.
+
+    The samples are hashed as float64, so the same values uploaded as int16,
+    float32 or a JSON list share one key.
+    """
+    samples = np.ascontiguousarray(emg_signal, dtype=np.float64)
+    digest = hashlib.sha256(samples.data)
+    digest.update(f"|{samples.shape}|{float(fs)!r}|{extractor_version()}".encode())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Time-domain features by ``signal_key``: a per-process LRU in front of an optional persistent store.
+
+    ``persistent`` needs a ``get(key)`` returning a feature dict or None and a
+    ``get_many(keys)`` returning ``{key: features}`` for the keys it has (see
+    api.feature_store); entries found there are promoted to memory. Rows are
+    written to the persistent tier by whoever stores the features with their
+    key, so ``put`` only fills memory.
+    """
+
+    def __init__(self, max_entries=FEATURE_CACHE_SIZE, persistent=None):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+        if features is not None:
+            metrics.feature_cache_lookups_total.inc(result="memory")
+            return dict(features)
+        if self.persistent is not None:
+            features = self.persistent.get(key)
+            if features is not None:
+                metrics.feature_cache_lookups_total.inc(result="persistent")
+                self.put(key, features)
+                return dict(features)
+        metrics.feature_cache_lookups_total.inc(result="miss")
+        return None
+
+    def get_many(self, keys):
+        """``get`` for several keys with one persistent lookup for all memory misses."""
+        with self._lock:
+            results = [self._entries.get(key) for key in keys]
+            for key, features in zip(keys, results):
+                if features is not None:
+                    self._entries.move_to_end(key)
+        results = [dict(features) if features is not None else None for features in results]
+        missing = [i for i, features in enumerate(results) if features is None]
+        if len(missing) < len(keys):
+            metrics.feature_cache_lookups_total.inc(len(keys) - len(missing), result="memory")
+        if missing and self.persistent is not None:
+            stored = self.persistent.get_many({keys[i] for i in missing})
+            for i in missing:
+                features = stored.get(keys[i])
+                if features is not None:
+                    metrics.feature_cache_lookups_total.inc(result="persistent")
+                    self.put(keys[i], features)
+                    results[i] = dict(features)
+        misses = results.count(None)
+        if misses:
+            metrics.feature_cache_lookups_total.inc(misses, result="miss")
+        return results
+
+    def put(self, key, features):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = dict(features)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def features(self, emg_signal, fs):
+        """``extract_features`` for one signal, skipping the DSP on a cache hit. Returns ``(features, key)``."""
+        with stage("feature_cache"):
+            key = signal_key(emg_signal, fs)
+            features = self.get(key)
+        if features is None:
+            with stage("filter"):
+                filtered = filter_signal(emg_signal, fs)
+            with stage("features"):
+                features = time_domain_features(filtered)
+            self.put(key, features)
+        return features, key
+
+    def features_batch(self, signals, fs):
+        """``extract_features_batch`` that only filters the signals missing from the cache."""
+        signals = [np.asarray(signal, dtype=float) for signal in signals]
+        with stage("feature_cache"):
+            keys = [signal_key(signal, fs) for signal in signals]
+            results = self.get_many(keys)
+        missing = [i for i, features in enumerate(results) if features is None]
+        if missing:
+            with stage("features"):
+                computed = extract_features_batch([signals[i] for i in missing], fs=fs)
+            for i, features in zip(missing, computed):
+                results[i] = features
+                self.put(keys[i], features)
+        return results
+
+
+# One per process; api.apps attaches the FeatureSet-backed persistent tier
+feature_cache = FeatureCache()
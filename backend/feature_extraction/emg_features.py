@@ -1,52 +1,117 @@
+from functools import lru_cache
 import numpy as np
-from scipy.signal import butter, lfilter
-
-def butter_bandpass(lowcut, highcut, fs, order=5):
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    b, a = butter(order, [low, high], btype='band')
-    return b, a
-
-def bandpass_filter(data, lowcut, highcut, fs, order=5):
-    b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-    y = lfilter(b, a, data)
-    return y
-
-def notch_filter(data, freq, fs, quality_factor=30):
-    nyq = 0.5 * fs
-    low = freq / nyq
-    high = low
-    b, a = butter(2, [low - (1 / (quality_factor * nyq)), high + (1 / (quality_factor * nyq))], btype='bandstop')
-    return lfilter(b, a, data)
+from scipy.signal import butter, iirnotch, sosfilt, sosfiltfilt, tf2sos
+from config import (
+    FILTER_HIGH_CUTOFF, FILTER_LOW_CUTOFF, FILTER_ORDER, FILTER_ZERO_PHASE,
+    NOTCH_FREQ, NOTCH_QUALITY_FACTOR,
+)
+
+# All functions below work on a 1-D signal or along the last axis of a
+# (channels x samples) / (signals x samples) array.
+
+class FilterChain:
+    """Bandpass and notch filter fused into one second-order-section cascade.
+
+    The sections are designed once and applied with a single ``sosfilt``
+    pass along the last axis. With ``zero_phase`` the cascade runs forwards
+    and backwards (``sosfiltfilt``); that needs the whole signal, so chunked
+    filtering with ``zi`` is only available for the causal form.
+    """
+
+    def __init__(self, fs, lowcut=FILTER_LOW_CUTOFF, highcut=FILTER_HIGH_CUTOFF, notch_freq=NOTCH_FREQ,
+                 order=FILTER_ORDER, quality_factor=NOTCH_QUALITY_FACTOR, zero_phase=False):
+        self.fs = fs
+        self.lowcut = lowcut
+        self.highcut = highcut
+        self.notch_freq = notch_freq
+        self.order = order
+        self.quality_factor = quality_factor
+        self.zero_phase = zero_phase
+        bandpass = butter(order, [lowcut, highcut], btype='band', fs=fs, output='sos')
+        notch = tf2sos(*iirnotch(notch_freq, quality_factor, fs=fs))
+        # Shared between callers through get_filter_chain; treat as read-only
+        self.sos = np.vstack([bandpass, notch])
+
+    def initial_state(self):
+        """Zero filter state for one 1-D stream, shaped for ``apply(..., zi=...)``."""
+        return np.zeros((self.sos.shape[0], 2))
+
+    def apply(self, data, zi=None):
+        """Filter ``data`` along its last axis.
+
+        Returns the filtered array, or ``(filtered, zf)`` when ``zi`` is given.
+        """
+        if self.zero_phase:
+            if zi is not None:
+                raise ValueError("A zero-phase filter chain cannot carry state between chunks")
+            return sosfiltfilt(self.sos, data, axis=-1)
+        if zi is None:
+            return sosfilt(self.sos, data, axis=-1)
+        return sosfilt(self.sos, data, axis=-1, zi=zi)
+
+@lru_cache(maxsize=32)
+def get_filter_chain(fs, lowcut=FILTER_LOW_CUTOFF, highcut=FILTER_HIGH_CUTOFF, notch_freq=NOTCH_FREQ,
+                     order=FILTER_ORDER, quality_factor=NOTCH_QUALITY_FACTOR, zero_phase=False):
+    """Cached FilterChain, so each sample rate's sections are designed once per process."""
+    return FilterChain(fs, lowcut, highcut, notch_freq, order, quality_factor, zero_phase)
 
 def compute_rms(data):
-    return np.sqrt(np.mean(data**2))
+    return np.sqrt(np.mean(data**2, axis=-1))
 
 def compute_mav(data):
-    return np.mean(np.abs(data))
+    return np.mean(np.abs(data), axis=-1)
 
 def compute_zero_crossings(data):
-    return np.sum(np.diff(np.sign(data)) != 0)
+    return np.count_nonzero(np.diff(np.sign(data), axis=-1), axis=-1)
 
 def compute_slope_sign_changes(data):
-    return np.sum(np.diff(np.sign(np.diff(data))) != 0)
+    return np.count_nonzero(np.diff(np.sign(np.diff(data, axis=-1)), axis=-1), axis=-1)
 
 def compute_waveform_length(data):
-    return np.sum(np.abs(np.diff(data)))
+    return np.sum(np.abs(np.diff(data, axis=-1)), axis=-1)
+
+def filter_signal(emg_signal, fs, zero_phase=None):
+    """Bandpass and notch filter a 1-D signal or each row of a 2-D array."""
+    emg_signal = np.asarray(emg_signal, dtype=float)
+    if emg_signal.ndim not in (1, 2):
+        raise ValueError(f"Expected a 1-D or 2-D EMG signal, got {emg_signal.ndim} dimensions")
+    if zero_phase is None:
+        zero_phase = FILTER_ZERO_PHASE
+    return get_filter_chain(fs, zero_phase=zero_phase).apply(emg_signal)
 
 def extract_features(emg_signal, fs):
-    filtered_signal = bandpass_filter(emg_signal, 20, 450, fs)
-    filtered_signal = notch_filter(filtered_signal, 50, fs)
+    """Extract time-domain features from a 1-D signal or a 2-D array.
 
-    features = {
+    A 1-D signal gives a dict of scalars. A 2-D array (channels x samples,
+    or a batch of equal-length signals) is filtered and reduced in one pass
+    and gives a dict of per-row arrays.
+    """
+    return time_domain_features(filter_signal(emg_signal, fs))
+
+def time_domain_features(filtered_signal):
+    return {
         'RMS': compute_rms(filtered_signal),
         'MAV': compute_mav(filtered_signal),
         'ZC': compute_zero_crossings(filtered_signal),
         'SSC': compute_slope_sign_changes(filtered_signal),
         'WL': compute_waveform_length(filtered_signal)
     }
-    
-    return features
 
-# Optional STFT functions can be added here for IMDF and IMNF calculations.
\ No newline at end of file
+def extract_features_batch(signals, fs):
+    """Extract features for a list of 1-D signals, one dict per signal.
+
+    Signals of equal length are stacked and go through extract_features
+    together; each distinct length costs one vectorized pass.
+    """
+    signals = [np.asarray(signal, dtype=float) for signal in signals]
+    results = [None] * len(signals)
+    by_length = {}
+    for i, signal in enumerate(signals):
+        by_length.setdefault(signal.shape[-1], []).append(i)
+    for indices in by_length.values():
+        features = extract_features(np.stack([signals[i] for i in indices]), fs)
+        for row, i in enumerate(indices):
+            results[i] = {name: values[row] for name, values in features.items()}
+    return results
+
+# Windowed spectral features (MDF/MNF) and fatigue trends live in feature_extraction.spectral.
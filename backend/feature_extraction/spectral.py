@@ -0,0 +1,64 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from feature_extraction.emg_features import filter_signal
+
+# All windows of a recording are cut with sliding_window_view (no copies) and
+# transformed with one batched rfft, so cost grows with signal length, not
+# with a Python loop per window.
+
+def window_spectra(filtered_signal, fs, window_seconds=0.5, overlap=0.5):
+    """Return (windows, freqs, power) for Hann-tapered windows along the last axis.
+
+    ``windows`` has shape (..., n_windows, window_length) and ``power`` has
+    shape (..., n_windows, n_freqs). Signals shorter than one window give a
+    single window covering the whole signal.
+    """
+    filtered_signal = np.asarray(filtered_signal, dtype=float)
+    length = min(int(round(window_seconds * fs)), filtered_signal.shape[-1])
+    step = max(1, int(round(length * (1 - overlap))))
+    windows = sliding_window_view(filtered_signal, length, axis=-1)[..., ::step, :]
+    centered = windows - windows.mean(axis=-1, keepdims=True)
+    power = np.abs(np.fft.rfft(centered * np.hanning(length), axis=-1)) ** 2
+    freqs = np.fft.rfftfreq(length, d=1.0 / fs)
+    return windows, freqs, power
+
+def mean_frequency(freqs, power):
+    total = power.sum(axis=-1)
+    return np.divide(power @ freqs, total, out=np.zeros_like(total), where=total > 0)[()]
+
+def median_frequency(freqs, power):
+    cumulative = np.cumsum(power, axis=-1)
+    half = cumulative[..., -1:] / 2
+    return freqs[np.argmax(cumulative >= half, axis=-1)]
+
+def time_correlation(values):
+    """Pearson correlation of per-window values with window index, along the last axis."""
+    values = np.asarray(values, dtype=float)
+    t = np.arange(values.shape[-1], dtype=float)
+    t -= t.mean()
+    centered = values - values.mean(axis=-1, keepdims=True)
+    denom = np.sqrt((centered ** 2).sum(axis=-1) * (t ** 2).sum())
+    return np.divide(centered @ t, denom, out=np.zeros_like(denom), where=denom > 0)[()]
+
+def fatigue_level(rms, mdf, mnf):
+    """Fatigue index in [0, 1]: rising RMS and falling MDF/MNF point to fatigue."""
+    level = 0.5 * ((rms - 0.5) / (2.0 - 0.5)) + \
+            0.25 * (1 - (mdf - 80) / (150 - 80)) + \
+            0.25 * (1 - (mnf - 80) / (150 - 80))
+    return np.clip(level, 0, 1)
+
+def spectral_features(filtered_signal, fs, window_seconds=0.5, overlap=0.5):
+    """MDF/MNF averaged over windows plus RMS and MNF trends over the recording."""
+    windows, freqs, power = window_spectra(filtered_signal, fs, window_seconds, overlap)
+    window_rms = np.sqrt(np.mean(windows ** 2, axis=-1))
+    window_mdf = median_frequency(freqs, power)
+    window_mnf = mean_frequency(freqs, power)
+    return {
+        'MDF': window_mdf.mean(axis=-1),
+        'MNF': window_mnf.mean(axis=-1),
+        'rms_time_corr': time_correlation(window_rms),
+        'mnf_time_corr': time_correlation(window_mnf),
+    }
+
+def extract_spectral_features(emg_signal, fs, window_seconds=0.5, overlap=0.5):
+    return spectral_features(filter_signal(emg_signal, fs), fs, window_seconds, overlap)
@@ -0,0 +1,142 @@
+import numpy as np
+from config import FILTER_HIGH_CUTOFF, FILTER_LOW_CUTOFF, FILTER_ORDER, NOTCH_FREQ
+from feature_extraction.emg_features import get_filter_chain, time_domain_features
+
+# Bumped whenever the filter state layout changes; older states are rejected
+STATE_VERSION = 2
+
+
+class StreamingFeatureExtractor:
+    """Chunk-by-chunk equivalent of ``extract_features``.
+
+    The filter cascade state (``zi``) is carried between chunks and the
+    time-domain features are kept as running sums, so feeding a signal in any
+    number of chunks and calling ``finalize`` gives the same features as
+    running ``extract_features`` on the whole signal with the causal filter.
+    The state round-trips through ``to_state``/``from_state`` as plain JSON.
+    """
+
+    def __init__(self, fs, lowcut=FILTER_LOW_CUTOFF, highcut=FILTER_HIGH_CUTOFF, notch_freq=NOTCH_FREQ, order=FILTER_ORDER):
+        self.fs = fs
+        self.lowcut = lowcut
+        self.highcut = highcut
+        self.notch_freq = notch_freq
+        self.order = order
+        self._chain = get_filter_chain(fs, lowcut, highcut, notch_freq, order)
+        self.zi = self._chain.initial_state()
+        # Last two filtered samples, needed for ZC/SSC/WL across chunk boundaries
+        self.tail = np.zeros(0)
+        self.n_samples = 0
+        self.sum_squares = 0.0
+        self.sum_abs = 0.0
+        self.zero_crossings = 0
+        self.slope_sign_changes = 0
+        self.waveform_length = 0.0
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=float).ravel()
+        if chunk.size == 0:
+            return
+        filtered, self.zi = self._chain.apply(chunk, zi=self.zi)
+
+        self.n_samples += filtered.size
+        self.sum_squares += float(np.dot(filtered, filtered))
+        self.sum_abs += float(np.sum(np.abs(filtered)))
+
+        extended = np.concatenate([self.tail, filtered])
+        diffs = np.diff(extended[-(filtered.size + 1):])
+        self.waveform_length += float(np.sum(np.abs(diffs)))
+        self.zero_crossings += int(np.count_nonzero(np.diff(np.sign(extended[-(filtered.size + 1):]))))
+        self.slope_sign_changes += int(np.count_nonzero(np.diff(np.sign(np.diff(extended)))))
+        self.tail = extended[-2:]
+
+    def finalize(self):
+        if self.n_samples == 0:
+            raise ValueError("No EMG samples have been streamed")
+        return {
+            'RMS': np.sqrt(self.sum_squares / self.n_samples),
+            'MAV': self.sum_abs / self.n_samples,
+            'ZC': self.zero_crossings,
+            'SSC': self.slope_sign_changes,
+            'WL': self.waveform_length
+        }
+
+    def to_state(self):
+        return {
+            'version': STATE_VERSION,
+            'fs': self.fs,
+            'lowcut': self.lowcut,
+            'highcut': self.highcut,
+            'notch_freq': self.notch_freq,
+            'order': self.order,
+            'zi': self.zi.tolist(),
+            'tail': self.tail.tolist(),
+            'n_samples': self.n_samples,
+            'sum_squares': self.sum_squares,
+            'sum_abs': self.sum_abs,
+            'zero_crossings': self.zero_crossings,
+            'slope_sign_changes': self.slope_sign_changes,
+            'waveform_length': self.waveform_length,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported streaming state version: {state.get('version')}")
+        extractor = cls(state['fs'], state['lowcut'], state['highcut'], state['notch_freq'], state['order'])
+        extractor.zi = np.asarray(state['zi'], dtype=float)
+        extractor.tail = np.asarray(state['tail'], dtype=float)
+        extractor.n_samples = state['n_samples']
+        extractor.sum_squares = state['sum_squares']
+        extractor.sum_abs = state['sum_abs']
+        extractor.zero_crossings = state['zero_crossings']
+        extractor.slope_sign_changes = state['slope_sign_changes']
+        extractor.waveform_length = state['waveform_length']
+        return extractor
+
+
+class SlidingWindowScorer:
+    """Filtered ring buffer that yields features over the last ``window_seconds``.
+
+    Samples are filtered once as they arrive (filter state carried across
+    chunks) and kept in a fixed-size ring buffer. ``push`` returns True when
+    the buffer is full and at least ``hop_seconds`` of new samples arrived
+    since the last ``window_features`` call; a chunk spanning several hops
+    only yields the newest window.
+    """
+
+    def __init__(self, fs, window_seconds=2.0, hop_seconds=0.25, lowcut=FILTER_LOW_CUTOFF,
+                 highcut=FILTER_HIGH_CUTOFF, notch_freq=NOTCH_FREQ, order=FILTER_ORDER):
+        self.fs = fs
+        self.window = int(round(window_seconds * fs))
+        self.hop = max(1, int(round(hop_seconds * fs)))
+        self._chain = get_filter_chain(fs, lowcut, highcut, notch_freq, order)
+        self._zi = self._chain.initial_state()
+        self.buffer = np.zeros(self.window)
+        self.position = 0
+        self.filled = 0
+        self.n_samples = 0
+        self._since_last = 0
+
+    def push(self, chunk):
+        chunk = np.asarray(chunk, dtype=float).ravel()
+        if chunk.size:
+            filtered, self._zi = self._chain.apply(chunk, zi=self._zi)
+            filtered = filtered[-self.window:]
+            end = self.position + filtered.size
+            if end <= self.window:
+                self.buffer[self.position:end] = filtered
+            else:
+                split = self.window - self.position
+                self.buffer[self.position:] = filtered[:split]
+                self.buffer[:end - self.window] = filtered[split:]
+            self.position = end % self.window
+            self.filled = min(self.window, self.filled + filtered.size)
+            self.n_samples += chunk.size
+            self._since_last += chunk.size
+        return self.filled == self.window and self._since_last >= self.hop
+
+    def window_features(self):
+        window = np.concatenate((self.buffer[self.position:], self.buffer[:self.position]))
+        self._since_last = 0
+        return time_domain_features(window)
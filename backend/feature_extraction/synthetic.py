@@ -0,0 +1,33 @@
+import numpy as np
+from config import NOISE_LEVEL, SYNTHETIC_DATA_SIZE
+from feature_extraction.emg_features import get_filter_chain
+
+
+class SyntheticEMG:
+    """Endless EMG-like signal for simulators and load tests.
+
+    Band-limited noise (the pipeline's own 20-450 Hz chain applied to white
+    noise) is modulated by a contraction envelope that rises and falls every
+    ``contraction_seconds``, plus white sensor noise of ``noise_level``
+    relative to full contraction. ``read`` continues the same signal across
+    calls, so any block size gives the same samples.
+    """
+
+    def __init__(self, fs=1000, noise_level=NOISE_LEVEL, contraction_seconds=4.0, seed=None):
+        self.fs = fs
+        self.noise_level = noise_level
+        self.contraction_seconds = contraction_seconds
+        # Separate generators, so the samples don't depend on how reads are split
+        self._muscle_rng, self._noise_rng = np.random.default_rng(seed).spawn(2)
+        self._chain = get_filter_chain(fs)
+        self._zi = self._chain.initial_state()
+        self._n = 0
+        # Band-limited unit noise has a much smaller std than its input
+        self._gain = 1.0 / np.std(self._chain.apply(np.random.default_rng(0).normal(size=int(fs * 10)))[int(fs):])
+
+    def read(self, n_samples=SYNTHETIC_DATA_SIZE):
+        t = (self._n + np.arange(n_samples)) / self.fs
+        self._n += n_samples
+        muscle, self._zi = self._chain.apply(self._muscle_rng.normal(size=n_samples), zi=self._zi)
+        envelope = 0.1 + 0.9 * np.sin(np.pi * t / self.contraction_seconds) ** 2
+        return envelope * muscle * self._gain + self.noise_level * self._noise_rng.normal(size=n_samples)
@@ -0,0 +1,32 @@
+"""Gunicorn settings for the backend.
+
+    gunicorn -c gunicorn.conf.py
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker backend.asgi:application
+
+With ``preload_app`` the master imports Django (and, through api.apps, the
+prediction models) once before forking, so workers share the model pages
+copy-on-write instead of each unpickling its own copy. With
+MODEL_ARTIFACTS=compiled the tree arrays are memory-mapped as well, so they
+stay shared even after a worker reloads a changed model.
+"""
+import gc
+import os
+
+wsgi_app = "backend.wsgi:application"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+# Read by backend.settings when the app is imported
+os.environ.setdefault("PRELOAD_MODELS", "True")
+
+
+def pre_fork(server, worker):
+    # Objects loaded so far are never collected in the workers, so the
+    # collector doesn't write to their pages and un-share them
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Thread-mode prediction jobs queued before a restart run in the new workers
+    from api.jobs import resume_jobs
+    resume_jobs()
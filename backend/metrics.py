@@ -0,0 +1,155 @@
+"""In-process timing and Prometheus metrics, shared by the API and the pipeline.
+
+Code wraps each step of work in ``stage("name")``. Every stage feeds the
+``neurisk_stage_duration_seconds`` histogram, and a stage that runs inside an
+HTTP request is also reported in that response's ``Server-Timing`` header
+(see api.middleware). Metrics live in the process that recorded them: each
+gunicorn worker serves its own numbers, and jobs run by
+``manage.py run_prediction_worker`` are not exposed.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond scoring up to slow multi-second requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f'{self.name}{_format_labels(zip(self.labelnames, key))} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts, sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in values:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", repr(float(bound)))])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+http_requests_total = registry.register(Counter(
+    'neurisk_http_requests_total', 'HTTP requests by endpoint, method and status.', ('endpoint', 'method', 'status'),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    'neurisk_http_request_duration_seconds', 'HTTP request latency by endpoint and method.', ('endpoint', 'method'),
+))
+stage_duration_seconds = registry.register(Histogram(
+    'neurisk_stage_duration_seconds', 'Time spent in each request or pipeline stage.', ('stage',),
+))
+feature_cache_lookups_total = registry.register(Counter(
+    'neurisk_feature_cache_lookups_total', 'Feature cache lookups by the tier that answered (memory, persistent) or miss.', ('result',),
+))
+
+# (stage, seconds) pairs for the request being served, or None outside a request
+_request_stages = contextvars.ContextVar('request_stages', default=None)
+
+
+def begin_request():
+    """Start collecting stages for Server-Timing; returns a token for end_request."""
+    return _request_stages.set([])
+
+
+def end_request(token):
+    stages = _request_stages.get()
+    _request_stages.reset(token)
+    return stages or []
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_duration_seconds.observe(elapsed, stage=name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((name, elapsed))
+
+
+def server_timing(stages, total=None):
+    """Server-Timing header value; repeated stages are summed."""
+    durations = {}
+    for name, elapsed in stages:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f'{name};dur={elapsed * 1000:.2f}' for name, elapsed in durations.items())
@@ -0,0 +1,216 @@
+import os
+import warnings
+import weakref
+import joblib
+import numpy as np
+
+# Packed artifact format version, stored in every exported artifact. Version 2
+# dropped the per-node missing_left array: inputs with NaN are rejected instead
+FORMAT_VERSION = 2
+
+
+def is_compiled_artifact(obj):
+    return isinstance(obj, dict) and int(obj.get('format_version', -1)) == FORMAT_VERSION
+
+
+class CompiledEnsemble:
+    """NumPy-only inference for an exported gradient-boosting classifier.
+
+    Every regression tree of the ensemble is padded to the same node count
+    and stored as (n_trees, n_nodes) arrays, so one step of traversal for all
+    rows and all trees is a handful of ``take`` calls; the loop runs
+    ``max_depth`` times, not once per tree. Exposes ``classes_``,
+    ``feature_names_in_``, ``predict`` and ``predict_proba`` like the
+    sklearn model it came from, and loads without sklearn.
+
+    Artifacts are either a portable ``.npz`` or an uncompressed joblib dict of
+    arrays. The latter loads with ``mmap_mode='r'`` so every process serving
+    the model shares one page-cache copy of the tree arrays.
+    """
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.init_raw = arrays['init_raw']
+        self.learning_rate = float(arrays['learning_rate'])
+        self.max_depth = int(arrays['max_depth'])
+        self.classes_ = arrays['classes']
+        feature_names = arrays.get('feature_names')
+        if feature_names is not None and len(feature_names):
+            self.feature_names_in_ = feature_names
+        self.n_features_in_ = int(arrays['n_features'])
+
+        # Flat node ids (tree * n_nodes + node) let traversal use 1-D take,
+        # and leaves point at themselves so finished trees need no masking
+        n_trees, n_nodes = self.feature.shape
+        offsets = (np.arange(n_trees) * n_nodes)[:, None]
+        own = offsets + np.arange(n_nodes)
+        is_leaf = self.left < 0
+        self._roots = offsets.ravel().astype(np.int32)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self._children = np.stack([
+            np.where(is_leaf, own, offsets + self.left).ravel(),
+            np.where(is_leaf, own, offsets + self.right).ravel(),
+        ], axis=1).ravel().astype(np.int32)
+        self._feature = self.feature.ravel().astype(np.int32)
+        self._threshold = np.asarray(self.threshold).ravel()
+        self._value = np.asarray(self.value).ravel()
+
+    def arrays(self):
+        arrays = {
+            'format_version': np.array(FORMAT_VERSION),
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'init_raw': self.init_raw,
+            'learning_rate': np.array(self.learning_rate),
+            'max_depth': np.array(self.max_depth),
+            'classes': self.classes_,
+            'n_features': np.array(self.n_features_in_),
+        }
+        if hasattr(self, 'feature_names_in_'):
+            arrays['feature_names'] = self.feature_names_in_
+        return arrays
+
+    def save(self, path):
+        # Write beside the target and rename, so processes that have the old
+        # artifact memory-mapped never see a half-written file
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        if path.endswith('.npz'):
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **self.arrays())
+        else:
+            # Uncompressed, so the arrays can be memory-mapped on load
+            joblib.dump(self.arrays(), tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_arrays(cls, arrays, path=''):
+        if not is_compiled_artifact(arrays):
+            raise ValueError(f"Unsupported compiled model format in {path}")
+        return cls(arrays)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        if path.endswith('.npz'):
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        else:
+            arrays = joblib.load(path, mmap_mode=mmap_mode)
+        return cls.from_arrays(arrays, path)
+
+    def leaf_values(self, X):
+        """Leaf value reached in every tree, shape (n_rows, n_trees)."""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2-D array with {self.n_features_in_} features, got shape {X.shape}")
+        flat_X = X.ravel()
+        row_base = (np.arange(X.shape[0], dtype=np.int32) * X.shape[1])[:, None]
+        if not np.isfinite(flat_X).all():
+            # GradientBoostingClassifier rejects these as well
+            raise ValueError("Input X contains NaN or infinity")
+        node = np.broadcast_to(self._roots, (X.shape[0], self._roots.size))
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_base + self._feature.take(node))
+            go_right = x > self._threshold.take(node)
+            node = self._children.take(2 * node + go_right)
+        return self._value.take(node)
+
+    def decision_function(self, X):
+        leaves = self.leaf_values(X)
+        # Trees are stored stage-major, one per class within each stage
+        per_class = leaves.reshape(leaves.shape[0], -1, self.init_raw.size).sum(axis=1)
+        return self.init_raw + self.learning_rate * per_class
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        proba = np.exp(raw)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        raw = self.decision_function(X)
+        if raw.shape[1] == 1:
+            return self.classes_[(raw[:, 0] > 0).astype(int)]
+        return self.classes_[np.argmax(raw, axis=1)]
+
+
+def export_ensemble(model):
+    """Flatten a fitted GradientBoostingClassifier into a CompiledEnsemble.
+
+    Raises ValueError for models it can't represent: other estimator types or
+    an ``init`` estimator whose predictions depend on the input row.
+    """
+    from sklearn.dummy import DummyClassifier
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    if not isinstance(model, GradientBoostingClassifier):
+        raise ValueError(f"Cannot compile {type(model).__name__}; only GradientBoostingClassifier is supported")
+    if model.init_ != 'zero' and not isinstance(model.init_, DummyClassifier):
+        raise ValueError("Cannot compile a gradient-boosting model with an input-dependent init estimator")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        # The prior does not depend on the row, so one dummy row gives it
+        init_raw = np.asarray(model._raw_predict_init(np.zeros((1, model.n_features_in_))), dtype=float)[0]
+
+    n_stages, n_outputs = model.estimators_.shape
+    trees = [model.estimators_[stage, k].tree_ for stage in range(n_stages) for k in range(n_outputs)]
+    n_nodes = max(tree.node_count for tree in trees)
+    shape = (len(trees), n_nodes)
+    feature = np.zeros(shape, dtype=np.int32)
+    threshold = np.zeros(shape)
+    left = np.full(shape, -1, dtype=np.int32)
+    right = np.full(shape, -1, dtype=np.int32)
+    value = np.zeros(shape)
+    for t, tree in enumerate(trees):
+        count = tree.node_count
+        is_split = tree.children_left[:count] >= 0
+        feature[t, :count] = np.where(is_split, tree.feature[:count], 0)
+        threshold[t, :count] = tree.threshold[:count]
+        left[t, :count] = tree.children_left[:count]
+        right[t, :count] = tree.children_right[:count]
+        value[t, :count] = tree.value[:count, 0, 0]
+
+    feature_names = getattr(model, 'feature_names_in_', None)
+    return CompiledEnsemble({
+        'feature': feature,
+        'threshold': threshold,
+        'left': left,
+        'right': right,
+        'value': value,
+        'init_raw': init_raw,
+        'learning_rate': np.array(model.learning_rate),
+        'max_depth': np.array(max(tree.max_depth for tree in trees)),
+        'classes': np.asarray(model.classes_).astype(str),
+        'feature_names': np.asarray(feature_names, dtype=str) if feature_names is not None else np.array([], dtype=str),
+        'n_features': np.array(model.n_features_in_),
+    })
+
+
+# model -> CompiledEnsemble (or None when it can't be compiled)
+_compiled = weakref.WeakKeyDictionary()
+
+def compiled_model(model):
+    """Return the cached CompiledEnsemble for a loaded model, or None if it can't be compiled."""
+    if isinstance(model, CompiledEnsemble):
+        return model
+    try:
+        return _compiled[model]
+    except KeyError:
+        pass
+    try:
+        engine = export_ensemble(model)
+    except (ImportError, ValueError):
+        engine = None
+    _compiled[model] = engine
+    return engine
@@ -1,8 +1,11 @@
-import joblib
+import warnings
+import weakref
 import numpy as np
 import pandas as pd
-from feature_extraction.emg_features import extract_features
-from config import MODEL_PATHS
+from feature_extraction.cache import feature_cache
+from metrics import stage
+from prediction.compiled import compiled_model
+from prediction.registry import model_registry
 
 # Keep your demographic columns list consistent with training
 DEMOGRAPHIC_COLS = [
@@ -13,44 +16,199 @@ DEMOGRAPHIC_COLS = [
 PREVIOUS_INJURY_CATEGORIES = ['calves', 'hamstrings', 'quadriceps', 'none']
 CONTRACTION_TYPE_CATEGORIES = ['isometric', 'concentric', 'eccentric']
 
-class InjuryRiskPredictor:
-    def __init__(self):
-        self.models = {
-            'calves': joblib.load(MODEL_PATHS['calves']),
-            'hamstrings': joblib.load(MODEL_PATHS['hamstrings']),
-            'quadriceps': joblib.load(MODEL_PATHS['quadriceps'])
+# Weights used to turn class probabilities into a single 0-1 risk score
+RISK_LEVEL_WEIGHTS = {'low': 0.0, 'medium': 0.5, 'high': 1.0}
+
+# The NumPy tree engine beats sklearn for small batches; past this many rows
+# sklearn's compiled traversal is faster, so it's used when available
+COMPILED_MAX_ROWS = 64
+
+
+def _without_feature_names(method, X):
+    """Call a sklearn predict method on a plain array laid out by FeatureSchema.
+
+    The array is already in the model's own column order, so sklearn's
+    missing-feature-names warning is noise; it's silenced for this call only.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        return method(X)
+
+
+class FeatureSchema:
+    """A model's ``feature_names_in_`` compiled into a column index map.
+
+    ``matrix`` writes demographic, EMG and one-hot values straight into a
+    preallocated float64 array in the model's column order. Columns the
+    model expects but the inputs don't provide stay 0, and inputs the model
+    wasn't trained on are dropped, matching a DataFrame reindex. Names are
+    matched case-insensitively: ``extract_features`` returns ``RMS`` while
+    the models were trained on ``rms_calves``.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names = list(feature_names)
+        self.index = {name.lower(): i for i, name in enumerate(self.feature_names)}
+        self._demographic = [(col, self.index[col]) for col in DEMOGRAPHIC_COLS if col in self.index]
+        self._previous_injury = {
+            cat: self.index[f"previous_injury_{cat}"]
+            for cat in PREVIOUS_INJURY_CATEGORIES if f"previous_injury_{cat}" in self.index
+        }
+        self._contraction_type = {
+            cat: self.index[f"contraction_type_{cat}"]
+            for cat in CONTRACTION_TYPE_CATEGORIES if f"contraction_type_{cat}" in self.index
         }
 
-    def prepare_features_for_prediction(self, user_inputs, emg_features, muscle):
+    def matrix(self, rows, muscle):
+        """Build an (n_rows, n_features) matrix from (user_inputs, emg_features) pairs."""
+        rows = list(rows)
+        X = np.zeros((len(rows), len(self.feature_names)))
+        index = self.index
+        for r, (user_inputs, emg_features) in enumerate(rows):
+            for col, i in self._demographic:
+                X[r, i] = user_inputs.get(col, 0)
+            for feat_name, feat_val in emg_features.items():
+                i = index.get(f"{feat_name}_{muscle}".lower())
+                if i is not None:
+                    X[r, i] = feat_val
+            i = self._previous_injury.get(user_inputs.get('previous_injury', 'none'))
+            if i is not None:
+                X[r, i] = 1
+            i = self._contraction_type.get(user_inputs.get('contraction_type', 'isometric'))
+            if i is not None:
+                X[r, i] = 1
+        return X
+
+
+# model -> FeatureSchema; entries go away with the model when the registry reloads it
+_schemas = weakref.WeakKeyDictionary()
+
+def feature_schema(model):
+    """Return the compiled FeatureSchema for a model, or None if it has no feature names."""
+    try:
+        return _schemas[model]
+    except KeyError:
+        pass
+    feature_names = getattr(model, "feature_names_in_", None)
+    schema = FeatureSchema(feature_names) if feature_names is not None else None
+    _schemas[model] = schema
+    return schema
+
+class InjuryRiskPredictor:
+    def __init__(self, registry=None, compiled=True, cache=None):
+        # Models come from the process-wide registry, loaded on first use
+        self.models = registry if registry is not None else model_registry
+        # Raw signals already seen skip filtering and feature extraction
+        self.feature_cache = cache if cache is not None else feature_cache
+        # Score with the NumPy tree engine when the model can be compiled
+        self.compiled = compiled
+
+    def _engine(self, model, n_rows=1):
+        if self.compiled and n_rows <= COMPILED_MAX_ROWS:
+            engine = compiled_model(model)
+            if engine is not None:
+                return engine
+        return model
+
+    def _feature_row(self, user_inputs, emg_features, muscle):
         base_features = {}
         for col in DEMOGRAPHIC_COLS:
             base_features[col] = user_inputs.get(col, 0)
         for feat_name, feat_val in emg_features.items():
-            base_features[f"{feat_name}_{muscle}"] = feat_val
+            base_features[f"{feat_name}_{muscle}".lower()] = feat_val
         prev_injury_val = user_inputs.get('previous_injury', 'none')
         for cat in PREVIOUS_INJURY_CATEGORIES:
             base_features[f"previous_injury_{cat}"] = 1 if prev_injury_val == cat else 0
         contraction_val = user_inputs.get('contraction_type', 'isometric')
         for cat in CONTRACTION_TYPE_CATEGORIES:
             base_features[f"contraction_type_{cat}"] = 1 if contraction_val == cat else 0
-        return pd.DataFrame([base_features])
-
-    def predict(self, user_inputs, raw_emg_signal, muscle_group):
-        features = extract_features(raw_emg_signal, fs=1000)
-        X_pred = self.prepare_features_for_prediction(user_inputs, features, muscle_group)
-        model = self.models[muscle_group]
-        # Align features with model
-        expected_features = list(getattr(model, "feature_names_in_", []))
-        if expected_features:
-            # Add missing columns with 0
-            for col in expected_features:
-                if col not in X_pred.columns:
-                    X_pred[col] = 0
-            # Remove unexpected columns
-            X_pred = X_pred[expected_features]
-        prediction = model.predict(X_pred)
+        return base_features
+
+    def prepare_features_for_prediction(self, user_inputs, emg_features, muscle):
+        return pd.DataFrame([self._feature_row(user_inputs, emg_features, muscle)])
+
+    def _feature_matrix(self, model, rows, muscle):
+        schema = feature_schema(model)
+        if schema is None:
+            # Model fitted without column names: pass columns in _feature_row order
+            return pd.DataFrame([self._feature_row(user_inputs, emg_features, muscle) for user_inputs, emg_features in rows])
+        return schema.matrix(rows, muscle)
+
+    def predict(self, user_inputs, raw_emg_signal, muscle_group, fs=1000):
+        features, _ = self.feature_cache.features(raw_emg_signal, fs)
+        return self.predict_from_features(user_inputs, features, muscle_group)
+
+    def predict_from_features(self, user_inputs, features, muscle_group):
+        with stage("model_load"):
+            model = self.models[muscle_group]
+        with stage("feature_matrix"):
+            X_pred = self._feature_matrix(model, [(user_inputs, features)], muscle_group)
+        with stage("predict"):
+            prediction = _without_feature_names(self._engine(model).predict, X_pred)
         return prediction[0]
 
+    def _levels_and_scores(self, model, X_pred):
+        model = self._engine(model, len(X_pred))
+        if not hasattr(model, "predict_proba"):
+            levels = _without_feature_names(model.predict, X_pred)
+            return levels, [RISK_LEVEL_WEIGHTS.get(level, 0.0) for level in levels]
+        proba = _without_feature_names(model.predict_proba, X_pred)
+        weights = np.array([RISK_LEVEL_WEIGHTS.get(cls, 0.0) for cls in model.classes_])
+        return model.classes_[np.argmax(proba, axis=1)], proba @ weights
+
+    def score_features_batch(self, items):
+        """Score many (user_inputs, emg_features, muscle_group) items.
+
+        Returns ``(risk_level, score)`` pairs in input order, where score is
+        the probability-weighted risk on a 0 (low) to 1 (high) scale.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        by_muscle = {}
+        for i, (_, _, muscle_group) in enumerate(items):
+            by_muscle.setdefault(muscle_group, []).append(i)
+        for muscle_group, indices in by_muscle.items():
+            with stage("model_load"):
+                model = self.models[muscle_group]
+            with stage("feature_matrix"):
+                X_pred = self._feature_matrix(model, [(items[i][0], items[i][1]) for i in indices], muscle_group)
+            with stage("predict"):
+                levels, scores = self._levels_and_scores(model, X_pred)
+            for i, level, score in zip(indices, levels, scores):
+                results[i] = (str(level), float(score))
+        return results
+
+    def score_from_features(self, user_inputs, features, muscle_group):
+        return self.score_features_batch([(user_inputs, features, muscle_group)])[0]
+
+    def model_version(self, muscle_group):
+        version = getattr(self.models, "version", None)
+        return version(muscle_group) if version is not None else ""
+
+    def predict_batch(self, items, fs=1000):
+        """Score many (user_inputs, raw_emg_signal, muscle_group) items.
+
+        Items are grouped by muscle group so each model's ``predict`` runs
+        once on a stacked matrix. Results are returned in input order.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        by_muscle = {}
+        for i, (_, _, muscle_group) in enumerate(items):
+            by_muscle.setdefault(muscle_group, []).append(i)
+        for muscle_group, indices in by_muscle.items():
+            with stage("model_load"):
+                model = self.models[muscle_group]
+            group_features = self.feature_cache.features_batch([items[i][1] for i in indices], fs)
+            with stage("feature_matrix"):
+                X_pred = self._feature_matrix(
+                    model, [(items[i][0], features) for i, features in zip(indices, group_features)], muscle_group
+                )
+            with stage("predict"):
+                predictions = _without_feature_names(self._engine(model, len(X_pred)).predict, X_pred)
+            for i, prediction in zip(indices, predictions):
+                results[i] = prediction
+        return results
+
 def predict_injury_risk(user_inputs, raw_emg_signal, muscle_group):
-    predictor = InjuryRiskPredictor()
-    return predictor.predict(user_inputs, raw_emg_signal, muscle_group)
+    return InjuryRiskPredictor().predict(user_inputs, raw_emg_signal, muscle_group)
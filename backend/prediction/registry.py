@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+import joblib
+from config import MODEL_PATHS
+from prediction.compiled import CompiledEnsemble, is_compiled_artifact
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Per-process cache of the per-muscle models.
+
+    Models are loaded lazily on first use and reloaded when the file on
+    disk changes (mtime or size), so a retrained model can be dropped into
+    ``backend/models`` without restarting the workers. Paths may also point
+    at compiled ensembles written by ``manage.py export_models``; their
+    arrays are memory-mapped (``mmap_mode``) and shared between processes.
+    """
+
+    def __init__(self, paths=None, mmap_mode='r'):
+        self.paths = dict(paths if paths is not None else MODEL_PATHS)
+        self.mmap_mode = mmap_mode
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, path):
+        if path.endswith('.npz'):
+            return CompiledEnsemble.load(path)
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        if is_compiled_artifact(model):
+            return CompiledEnsemble(model)
+        return model
+
+    def use_paths(self, paths):
+        """Point the registry at a different set of model files, dropping loaded models."""
+        with self._lock:
+            self.paths = dict(paths)
+            self._models.clear()
+
+    def get(self, muscle_group):
+        if muscle_group not in self.paths:
+            raise KeyError(f"No model registered for muscle group '{muscle_group}'")
+        path = self.paths[muscle_group]
+        signature = self._signature(path)
+        entry = self._models.get(muscle_group)
+        if entry is None or entry[0] != signature:
+            with self._lock:
+                entry = self._models.get(muscle_group)
+                if entry is None or entry[0] != signature:
+                    entry = (signature, self._load(path), _file_digest(path))
+                    self._models[muscle_group] = entry
+        return entry[1]
+
+    def version(self, muscle_group):
+        """Short content hash of the loaded model file, stored with each RiskScore."""
+        self.get(muscle_group)
+        return f"{muscle_group}:{self._models[muscle_group][2]}"
+
+    def preload(self):
+        for muscle_group in self.paths:
+            self.get(muscle_group)
+
+    def is_loaded(self, muscle_group):
+        return muscle_group in self._models
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def keys(self):
+        return self.paths.keys()
+
+    def __getitem__(self, muscle_group):
+        return self.get(muscle_group)
+
+    def __contains__(self, muscle_group):
+        return muscle_group in self.paths
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+
+# Shared by the API views, predict_injury_risk and the Streamlit app
+model_registry = ModelRegistry()
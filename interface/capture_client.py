@@ -0,0 +1,348 @@
+"""Capture EMG and stream it to the backend while the session is running.
+
+    python -m interface.capture_client --server http://localhost:8000 --tcp 192.168.4.1:3333 \\
+        --duration 30 --user athlete.json --device-id esp32-01
+
+A producer thread reads the device into a ring buffer (see emg_capture) and
+the uploader posts fixed-size binary chunks to ``/api/upload_emg/`` over one
+keep-alive connection. Chunks carry ``X-Chunk-Sequence``, so a retried chunk
+the server already stored is acknowledged with 200 instead of duplicated.
+When the capture ends only the last chunk is left to send, and the result is
+ready shortly after ``end_session``.
+"""
+import argparse
+import email.utils
+import http.client
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from .emg_capture import iter_samples, make_parser, open_serial, open_tcp, serial_reader, tcp_reader
+
+# Statuses worth retrying: the server or a proxy is overloaded or restarting
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class UploadError(Exception):
+    pass
+
+
+def retry_after_seconds(value, default):
+    """Seconds to wait from a Retry-After header, which is either delta-seconds or an HTTP-date."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when is None:
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RingBuffer:
+    """Fixed-capacity sample FIFO shared by one producer and one consumer thread.
+
+    ``write`` blocks while the buffer is full, so a slow uploader pauses the
+    reader: a TCP device is then throttled by flow control instead of samples
+    being dropped. ``overflows`` counts how often that happened.
+    """
+
+    def __init__(self, capacity):
+        self._data = np.empty(capacity, dtype=np.float32)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.overflows = 0
+
+    def __len__(self):
+        with self._cond:
+            return self._size
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        capacity = len(self._data)
+        while len(samples):
+            with self._cond:
+                if self._size == capacity:
+                    self.overflows += 1
+                while self._size == capacity and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                n = min(len(samples), capacity - self._size)
+                end = (self._start + self._size) % capacity
+                first = min(n, capacity - end)
+                self._data[end:end + first] = samples[:first]
+                self._data[:n - first] = samples[first:n]
+                self._size += n
+                self._cond.notify_all()
+            samples = samples[n:]
+
+    def read(self, min_samples, max_samples, timeout=None):
+        """Up to ``max_samples`` once at least ``min_samples`` are buffered (fewer once closed).
+
+        Returns an empty array on timeout, and ``None`` when the buffer is
+        closed and drained.
+        """
+        capacity = len(self._data)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size >= min_samples or self._closed, timeout):
+                return np.empty(0, dtype=np.float32)
+            if self._closed and not self._size:
+                return None
+            n = min(self._size, max_samples)
+            first = min(n, capacity - self._start)
+            out = np.concatenate([self._data[self._start:self._start + first], self._data[:n - first]])
+            self._start = (self._start + n) % capacity
+            self._size -= n
+            self._cond.notify_all()
+            return out
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class BackendClient:
+    """Small JSON/binary client for the session API over one persistent HTTP connection."""
+
+    def __init__(self, base_url, timeout=10, max_retries=5, backoff=0.25):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.https = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _decode(method, path, status, raw):
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            # e.g. a proxy's HTML error page
+            raise UploadError(f"{method} {path} returned a non-JSON response ({status})")
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request, reconnecting and backing off on connection errors and 429/5xx-busy responses.
+
+        Only GETs and chunk uploads (which carry ``X-Chunk-Sequence``) are
+        retried; sending start_session or end_session twice could create a
+        second session or prediction job, so those are sent once.
+
+        Returns ``(status, payload)`` with the decoded JSON body.
+        """
+        headers = dict(headers or {})
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        retries = self.max_retries if method == 'GET' or 'X-Chunk-Sequence' in headers else 0
+        for attempt in range(retries + 1):
+            delay = self.backoff * 2 ** attempt
+            try:
+                conn = self._connection()
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                response = conn.getresponse()
+                # Read the whole body so the connection can be reused
+                raw = response.read()
+                if response.status not in RETRY_STATUSES or not retries:
+                    return response.status, self._decode(method, path, response.status, raw)
+                delay = retry_after_seconds(response.getheader('Retry-After'), delay)
+            except (OSError, http.client.HTTPException):
+                self.close()
+            if attempt < retries:
+                time.sleep(delay)
+        raise UploadError(f"{method} {path} failed after {retries + 1} attempt(s)")
+
+    def start_session(self, user, duration, device_id):
+        status, payload = self.request('POST', '/api/start_session/', {'user': user, 'duration': duration, 'device_id': device_id})
+        if status != 201:
+            raise UploadError(f"start_session failed ({status}): {payload.get('error') or payload}")
+        return payload['session_id']
+
+    def next_sequence(self, session_id):
+        """Sequence number the server expects for the session's next chunk."""
+        status, payload = self.request('GET', f'/api/session_status/?session_id={session_id}')
+        if status != 200:
+            raise UploadError(f"session_status failed ({status}): {payload.get('error') or payload}")
+        return int(payload.get('next_sequence', 0))
+
+    def upload_chunk(self, session_id, sequence, samples, fs):
+        """Upload one chunk at ``sequence``; returns the sequence it was stored under.
+
+        On 409 the server expects a different sequence (another client wrote
+        to the session meanwhile), so the chunk is sent once more at the
+        server's ``expected_sequence``.
+        """
+        body = np.asarray(samples, dtype='<f4').tobytes()
+        for _ in range(2):
+            headers = {
+                'Content-Type': 'application/octet-stream',
+                'X-Session-Id': str(session_id),
+                'X-Chunk-Sequence': str(sequence),
+                'X-Sample-Rate': str(fs),
+                'X-EMG-Dtype': 'float32',
+            }
+            status, payload = self.request('POST', '/api/upload_emg/', body, headers)
+            if status in (200, 201):
+                return sequence
+            if status != 409 or 'expected_sequence' not in payload:
+                break
+            sequence = int(payload['expected_sequence'])
+        raise UploadError(f"upload_emg chunk {sequence} failed ({status}): {payload.get('error') or payload}")
+
+    def end_session(self, session_id, fs):
+        status, payload = self.request('POST', '/api/end_session/', {'session_id': session_id, 'fs': fs})
+        if status not in (200, 202):
+            raise UploadError(f"end_session failed ({status}): {payload.get('error') or payload}")
+        return payload
+
+    def wait_for_result(self, session_id, timeout=60, interval=0.5):
+        deadline = time.monotonic() + timeout
+        while True:
+            status, payload = self.request('GET', f'/api/session_status/?session_id={session_id}')
+            if status != 200:
+                raise UploadError(f"session_status failed ({status}): {payload.get('error') or payload}")
+            if payload.get('status') in ('completed', 'failed') or time.monotonic() > deadline:
+                return payload
+            time.sleep(interval)
+
+
+class StreamingCapture:
+    """Read a device on a background thread and upload it in chunks as it arrives.
+
+    ``read_into`` is a reader from emg_capture (``tcp_reader``/``serial_reader``).
+    Chunks hold ``chunk_seconds`` of samples; when the uploader falls behind it
+    sends up to ``max_chunk_factor`` chunks' worth per request to catch up.
+    """
+
+    def __init__(self, client, session_id, read_into, parser, fs=1000, chunk_seconds=0.5,
+                 buffer_seconds=60, max_chunk_factor=8):
+        self.client = client
+        self.session_id = session_id
+        self.read_into = read_into
+        self.parser = parser
+        self.fs = fs
+        self.chunk_samples = max(1, int(fs * chunk_seconds))
+        self.max_chunk_samples = self.chunk_samples * max_chunk_factor
+        self.buffer = RingBuffer(int(fs * buffer_seconds))
+        self.samples_captured = 0
+        self.samples_uploaded = 0
+        self.chunks_uploaded = 0
+        self._error = None
+
+    def _produce(self, duration):
+        try:
+            for samples in iter_samples(self.read_into, self.parser, duration):
+                self.samples_captured += len(samples)
+                self.buffer.write(samples)
+        except Exception as e:
+            self._error = e
+        finally:
+            self.buffer.close()
+
+    def run(self, duration):
+        """Capture for ``duration`` seconds, uploading as it goes; returns once every sample is sent."""
+        # A session that already has chunks (--session-id) continues where it left off
+        sequence = self.client.next_sequence(self.session_id)
+        producer = threading.Thread(target=self._produce, args=(duration,), name='emg-capture', daemon=True)
+        producer.start()
+        try:
+            while True:
+                # Short timeout so the final partial chunk goes out as soon as capture stops
+                chunk = self.buffer.read(self.chunk_samples, self.max_chunk_samples, timeout=1.0)
+                if chunk is None:
+                    break
+                if not len(chunk):
+                    continue
+                sequence = self.client.upload_chunk(self.session_id, sequence, chunk, self.fs) + 1
+                self.chunks_uploaded += 1
+                self.samples_uploaded += len(chunk)
+        finally:
+            # Unblocks the producer if the upload failed
+            self.buffer.close()
+            producer.join()
+        if self._error is not None:
+            raise self._error
+        return self.samples_uploaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--server', required=True, help="Backend base URL, e.g. http://localhost:8000")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--tcp', help="Device address as HOST:PORT")
+    source.add_argument('--serial', help="Serial port, e.g. /dev/ttyUSB0")
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--protocol', choices=['text', 'binary'], default='text')
+    parser.add_argument('--fs', type=float, default=1000, help="Device sample rate in Hz")
+    parser.add_argument('--duration', type=float, required=True, help="Capture length in seconds")
+    parser.add_argument('--chunk-seconds', type=float, default=0.5)
+    parser.add_argument('--session-id', type=int, help="Upload into an existing session")
+    parser.add_argument('--user', help="JSON file with the athlete profile, to start a new session")
+    parser.add_argument('--device-id', default='esp32')
+    args = parser.parse_args()
+
+    client = BackendClient(args.server)
+    session_id = args.session_id
+    if session_id is None:
+        if not args.user:
+            parser.error("--user is required unless --session-id is given")
+        with open(args.user) as f:
+            user = json.load(f)
+        # Leave headroom for connection setup and the last upload
+        session_id = client.start_session(user, int(args.duration) + 10, args.device_id)
+        print(f"Started session {session_id}")
+
+    if args.tcp:
+        host, port = args.tcp.rsplit(':', 1)
+        device = open_tcp(host, int(port))
+        read_into = tcp_reader(device)
+    else:
+        device = open_serial(args.serial, args.baud)
+        read_into = serial_reader(device)
+    try:
+        capture = StreamingCapture(
+            client, session_id, read_into, make_parser(args.protocol, skip_partial_first_line=bool(args.serial)),
+            fs=args.fs, chunk_seconds=args.chunk_seconds,
+        )
+        capture.run(args.duration)
+    finally:
+        device.close()
+    print(f"Uploaded {capture.samples_uploaded} samples in {capture.chunks_uploaded} chunks")
+
+    stopped = time.monotonic()
+    client.end_session(session_id, args.fs)
+    result = client.wait_for_result(session_id)
+    print(f"Result after {time.monotonic() - stopped:.1f}s: {json.dumps(result)}")
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
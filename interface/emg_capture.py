@@ -1,48 +1,217 @@
-import time
+"""Read raw EMG samples from the ESP32 over serial or TCP.
+
+Two wire formats are supported:
+
+* ``text``: one ASCII number per line (``"1234\\r\\n"``), what the current
+  firmware prints.
+* ``binary``: framed little-endian samples, for rates the text format can't
+  carry. Each frame is ``A5 5A``, a uint16 sequence number, a uint16 sample
+  count, ``count`` int16 samples and a uint16 checksum (sum of the sample
+  bytes mod 65536). Gaps in the sequence are counted in ``dropped_frames``.
+
+Readers pull large blocks with ``readinto``/``recv_into`` into one reusable
+buffer and parse everything received in one go, so they keep up with 10 kHz+
+streams without sleeping between samples.
+"""
 import socket
+import struct
+import time
+
+import numpy as np
 
 try:
     import serial
 except ImportError:
     serial = None
 
-def capture_emg_serial(port, baudrate, duration):
-    if serial is None:
-        raise ImportError("pyserial is not installed.")
-    ser = serial.Serial(port, baudrate, timeout=0.01)  # Short timeout!
-    data = []
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        line = ser.readline().decode('utf-8').strip()
-        if line:
+BLOCK_SIZE = 64 * 1024
+# How long one read may block waiting for data; bounds how late a capture stops
+READ_TIMEOUT = 0.05
+
+FRAME_MAGIC = b'\xa5\x5a'
+FRAME_HEADER = struct.Struct('<2sHH')
+FRAME_CHECKSUM = struct.Struct('<H')
+# Larger counts are treated as a corrupt header and skipped
+MAX_FRAME_SAMPLES = 4096
+
+
+class LineParser:
+    """Parse newline-separated ASCII numbers, keeping a partial last line for the next block."""
+
+    def __init__(self, skip_partial_first_line=False):
+        self._pending = bytearray()
+        # A serial port opened mid-stream starts in the middle of a line
+        self._synced = not skip_partial_first_line
+        self.bad_lines = 0
+
+    def feed(self, data):
+        self._pending += data
+        end = self._pending.rfind(b'\n')
+        if end < 0:
+            return np.empty(0)
+        start = 0
+        if not self._synced:
+            start = self._pending.find(b'\n') + 1
+            self._synced = True
+        lines = bytes(self._pending[start:end]).split()
+        del self._pending[:end + 1]
+        try:
+            return np.array(lines, dtype=float)
+        except ValueError:
+            pass
+        # Rare: a garbled line in the block, parse line by line and drop it
+        values = []
+        for line in lines:
             try:
-                value = float(line)
-                data.append(value)
+                values.append(float(line))
             except ValueError:
+                self.bad_lines += 1
+        return np.array(values, dtype=float)
+
+
+def _checksum(payload):
+    return int(np.frombuffer(payload, dtype=np.uint8).sum(dtype=np.uint64)) & 0xFFFF
+
+
+class FrameParser:
+    """Parse binary frames (see module docstring), resyncing on the magic bytes after corruption."""
+
+    def __init__(self, dtype='<i2'):
+        self.dtype = np.dtype(dtype)
+        self._pending = bytearray()
+        self._next_seq = None
+        self.frames = 0
+        self.dropped_frames = 0
+        self.bad_frames = 0
+
+    def feed(self, data):
+        self._pending += data
+        buf = self._pending
+        chunks = []
+        pos = 0
+        while True:
+            start = buf.find(FRAME_MAGIC, pos)
+            if start < 0:
+                # Keep a trailing byte that may be the first half of the magic
+                pos = max(pos, len(buf) - 1)
+                break
+            if len(buf) - start < FRAME_HEADER.size:
+                pos = start
+                break
+            _, seq, count = FRAME_HEADER.unpack_from(buf, start)
+            if count > MAX_FRAME_SAMPLES:
+                self.bad_frames += 1
+                pos = start + 1
+                continue
+            payload_start = start + FRAME_HEADER.size
+            payload_end = payload_start + count * self.dtype.itemsize
+            if len(buf) < payload_end + FRAME_CHECKSUM.size:
+                pos = start
+                break
+            payload = bytes(buf[payload_start:payload_end])
+            (checksum,) = FRAME_CHECKSUM.unpack_from(buf, payload_end)
+            if _checksum(payload) != checksum:
+                self.bad_frames += 1
+                pos = start + 1
                 continue
-        time.sleep(0.001)  # Prevent 100% CPU usage
-    ser.close()
-    return data
-
-def capture_emg_tcp(ip, port, duration):
-    data = []
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.connect((ip, port))
-    s.settimeout(0.01)  # Short timeout!
-    start_time = time.time()
-    while time.time() - start_time < duration:
+            if self._next_seq is not None and seq != self._next_seq:
+                self.dropped_frames += (seq - self._next_seq) & 0xFFFF
+            self._next_seq = (seq + 1) & 0xFFFF
+            self.frames += 1
+            chunks.append(np.frombuffer(payload, dtype=self.dtype).astype(float))
+            pos = payload_end + FRAME_CHECKSUM.size
+        del buf[:pos]
+        if not chunks:
+            return np.empty(0)
+        return np.concatenate(chunks)
+
+
+def encode_frame(samples, seq, dtype='<i2'):
+    """Build one binary frame; the inverse of FrameParser, used by simulators and tests."""
+    payload = np.asarray(samples).astype(dtype).tobytes()
+    count = len(payload) // np.dtype(dtype).itemsize
+    return FRAME_HEADER.pack(FRAME_MAGIC, seq & 0xFFFF, count) + payload + FRAME_CHECKSUM.pack(_checksum(payload))
+
+
+def make_parser(protocol, skip_partial_first_line=False):
+    if protocol == 'text':
+        return LineParser(skip_partial_first_line)
+    if protocol == 'binary':
+        return FrameParser()
+    raise ValueError(f"Unknown protocol '{protocol}', expected 'text' or 'binary'")
+
+
+def iter_samples(read_into, parser, duration=None, block_size=BLOCK_SIZE):
+    """Yield arrays of samples as blocks arrive, until ``duration`` seconds pass or the source closes.
+
+    ``read_into(buffer)`` fills a memoryview and returns the byte count:
+    ``0`` means the source closed, ``None`` that nothing arrived before its
+    timeout.
+    """
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    deadline = None if duration is None else time.monotonic() + duration
+    while deadline is None or time.monotonic() < deadline:
+        n = read_into(view)
+        if n == 0:
+            break
+        if not n:
+            continue
+        samples = parser.feed(view[:n])
+        if len(samples):
+            yield samples
+
+
+def _collect(chunks):
+    chunks = list(chunks)
+    if not chunks:
+        return np.empty(0)
+    return np.concatenate(chunks)
+
+
+def open_serial(port, baudrate):
+    if serial is None:
+        raise ImportError("pyserial is not installed.")
+    # readinto returns after READ_TIMEOUT with whatever arrived
+    return serial.Serial(port, baudrate, timeout=READ_TIMEOUT)
+
+
+def serial_reader(ser):
+    def read_into(view):
+        return ser.readinto(view) or None
+    return read_into
+
+
+def open_tcp(ip, port):
+    s = socket.create_connection((ip, port), timeout=5)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    s.settimeout(READ_TIMEOUT)
+    return s
+
+
+def tcp_reader(s):
+    def read_into(view):
         try:
-            line = s.recv(32).decode('utf-8').strip()
-            if line:
-                try:
-                    value = float(line)
-                    data.append(value)
-                except ValueError:
-                    continue
+            return s.recv_into(view)
         except socket.timeout:
-            continue
-        time.sleep(0.001)  # Prevent 100% CPU usage
-    s.close()
-    return data
+            return None
+    return read_into
+
+
+def capture_emg_serial(port, baudrate, duration, protocol='text'):
+    ser = open_serial(port, baudrate)
+    try:
+        parser = make_parser(protocol, skip_partial_first_line=True)
+        return _collect(iter_samples(serial_reader(ser), parser, duration))
+    finally:
+        ser.close()
+
+
+def capture_emg_tcp(ip, port, duration, protocol='text'):
+    s = open_tcp(ip, port)
+    try:
+        return _collect(iter_samples(tcp_reader(s), make_parser(protocol), duration))
+    finally:
+        s.close()
 
-# Optionally, you can add Bluetooth support here using bleak or pybluez
\ No newline at end of file
+# Optionally, you can add Bluetooth support here using bleak or pybluez
@@ -0,0 +1,178 @@
+"""Capture several sensor nodes at once and align them into one array.
+
+    python -m interface.multi_capture --node calves=tcp:192.168.4.1:3333 \\
+        --node hamstrings=tcp:192.168.4.2:3333 --node quadriceps=serial:/dev/ttyUSB0 \\
+        --duration 10 --fs 1000 --output capture.npz
+
+One thread waits on every node with ``selectors`` and reads whichever has
+data, so a slow node never stalls the others. Each block read is tagged with
+the host ``time.monotonic()`` at arrival. Transport only ever delays
+samples, so a node's start time is estimated from the block that arrived
+earliest relative to its sample count, and the streams are cut to the window
+they all cover. The result is a channels x samples array that
+``extract_features(data, fs)`` reduces in one pass.
+"""
+import argparse
+import selectors
+import socket
+import time
+
+import numpy as np
+
+from .emg_capture import BLOCK_SIZE, make_parser, open_serial, open_tcp
+
+
+class Node:
+    """One sensor node: ``kind`` is ``tcp`` (address ``host:port``) or ``serial`` (address ``port[@baud]``)."""
+
+    def __init__(self, name, kind, address, fs=1000, protocol='text'):
+        if kind not in ('tcp', 'serial'):
+            raise ValueError(f"Unknown node kind '{kind}', expected 'tcp' or 'serial'")
+        self.name = name
+        self.kind = kind
+        self.address = address
+        self.fs = fs
+        self.protocol = protocol
+        self.device = None
+        self.parser = None
+        self.blocks = []
+        self.samples = 0
+        # Earliest estimate of when sample 0 was taken, in host monotonic time
+        self.start_time = None
+
+    @classmethod
+    def parse(cls, spec, fs=1000, protocol='text'):
+        """``name=tcp:host:port`` or ``name=serial:/dev/ttyUSB0[@baud]``."""
+        name, _, target = spec.partition('=')
+        kind, _, address = target.partition(':')
+        if not name or not address:
+            raise ValueError(f"Invalid node '{spec}', expected name=tcp:host:port or name=serial:port[@baud]")
+        return cls(name, kind, address, fs=fs, protocol=protocol)
+
+    def open(self):
+        if self.kind == 'tcp':
+            host, port = self.address.rsplit(':', 1)
+            self.device = open_tcp(host, int(port))
+            self.device.setblocking(False)
+        else:
+            port, _, baud = self.address.partition('@')
+            self.device = open_serial(port, int(baud or 115200))
+            # Non-blocking: readinto returns whatever is buffered
+            self.device.timeout = 0
+        self.parser = make_parser(self.protocol, skip_partial_first_line=self.kind == 'serial')
+
+    def read_into(self, view):
+        if self.kind == 'tcp':
+            try:
+                return self.device.recv_into(view)
+            except (BlockingIOError, socket.timeout):
+                return None
+        return self.device.readinto(view) or None
+
+    def add_block(self, samples, arrived):
+        self.blocks.append(samples)
+        self.samples += len(samples)
+        # The last sample of the block was taken at or before it arrived
+        start = arrived - (self.samples - 1) / self.fs
+        if self.start_time is None or start < self.start_time:
+            self.start_time = start
+
+    def close(self):
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+
+
+def align_streams(nodes, fs=None):
+    """Cut the nodes' samples to their common time window; returns ``(data, start_time, fs)``.
+
+    Nodes at the same rate are aligned by whole-sample offsets. Mixed rates
+    are linearly resampled onto ``fs`` (default: the highest node rate).
+    """
+    nodes = [node for node in nodes if node.samples]
+    if not nodes:
+        return np.empty((0, 0)), None, fs
+    start = max(node.start_time for node in nodes)
+    end = min(node.start_time + node.samples / node.fs for node in nodes)
+    same_rate = len({node.fs for node in nodes}) == 1
+    fs = fs or max(node.fs for node in nodes)
+    n = max(0, int((end - start) * fs))
+    data = np.empty((len(nodes), n))
+    for row, node in zip(data, nodes):
+        signal = np.concatenate(node.blocks)
+        if same_rate and node.fs == fs:
+            offset = int(round((start - node.start_time) * fs))
+            segment = signal[offset:offset + n]
+            row[:len(segment)] = segment
+            row[len(segment):] = segment[-1] if len(segment) else 0.0
+        else:
+            times = node.start_time + np.arange(len(signal)) / node.fs
+            row[:] = np.interp(start + np.arange(n) / fs, times, signal)
+    return data, start, fs
+
+
+def capture_nodes(nodes, duration, fs=None):
+    """Read every node for ``duration`` seconds; returns a dict with the aligned ``data``.
+
+    ``data`` is channels x samples in the order of ``channels``; nodes that
+    sent nothing are listed in ``silent``.
+    """
+    selector = selectors.DefaultSelector()
+    buffer = bytearray(BLOCK_SIZE)
+    view = memoryview(buffer)
+    try:
+        for node in nodes:
+            node.open()
+            selector.register(node.device, selectors.EVENT_READ, node)
+        deadline = time.monotonic() + duration
+        while selector.get_map() and time.monotonic() < deadline:
+            for key, _ in selector.select(timeout=min(0.05, max(0.0, deadline - time.monotonic()))):
+                node = key.data
+                n = node.read_into(view)
+                arrived = time.monotonic()
+                if n == 0:
+                    # Device closed the connection
+                    selector.unregister(node.device)
+                    continue
+                if not n:
+                    continue
+                samples = node.parser.feed(view[:n])
+                if len(samples):
+                    node.add_block(samples, arrived)
+    finally:
+        selector.close()
+        for node in nodes:
+            node.close()
+
+    data, start, fs = align_streams(nodes, fs)
+    return {
+        'channels': [node.name for node in nodes if node.samples],
+        'silent': [node.name for node in nodes if not node.samples],
+        'data': data,
+        'fs': fs,
+        'start_time': start,
+        'samples_received': {node.name: node.samples for node in nodes},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--node', action='append', required=True, help="name=tcp:host:port or name=serial:port[@baud]")
+    parser.add_argument('--duration', type=float, required=True)
+    parser.add_argument('--fs', type=float, default=1000, help="Sample rate of every node, in Hz")
+    parser.add_argument('--protocol', choices=['text', 'binary'], default='text')
+    parser.add_argument('--output', default='capture.npz')
+    args = parser.parse_args()
+
+    nodes = [Node.parse(spec, fs=args.fs, protocol=args.protocol) for spec in args.node]
+    result = capture_nodes(nodes, args.duration)
+    np.savez(args.output, data=result['data'], channels=np.array(result['channels']), fs=result['fs'])
+    print(f"Wrote {args.output}: {result['data'].shape[0]} channels x {result['data'].shape[1]} samples")
+    for name, count in result['samples_received'].items():
+        print(f"  {name}: {count} samples received")
+    if result['silent']:
+        print(f"No data from: {', '.join(result['silent'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,17 @@
 import sys
 import os
+import io
 import time
+import hashlib
+from contextlib import contextmanager
 import streamlit as st
 import pandas as pd
 import numpy as np
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from src.prediction.predictor import InjuryRiskPredictor
-from src.feature_extraction.emg_features import extract_features
+from src.prediction.registry import model_registry
+from src.feature_extraction.emg_features import filter_signal, time_domain_features
+from src.feature_extraction.spectral import spectral_features, fatigue_level
 from src.interface.emg_capture import capture_emg_serial, capture_emg_tcp
 
 PREVIOUS_INJURY_CATEGORIES = ['calves', 'hamstrings', 'quadriceps', 'none']
@@ -46,6 +50,54 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner="Loading models...")
+def load_models():
+    # One registry per server process; the models are unpickled once, not on every rerun
+    model_registry.preload()
+    return model_registry
+
+
+@contextmanager
+def timed(name):
+    """Record how long a step took for the timing panel."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        st.session_state.setdefault('timings', {})[name] = (time.perf_counter() - start) * 1000
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Arguments starting with "_" are not hashed by st.cache_data; the content
+# hash in front of them is the cache key, which is far cheaper than hashing
+# a long recording on every rerun.
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_emg_csv(digest, _data):
+    return pd.read_csv(io.BytesIO(_data))
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_features(digest, muscle, fs, _emg_signal):
+    return features_from_signal(_emg_signal, muscle, fs)
+
+
+def features_from_signal(emg_signal, muscle, fs=1000):
+    # Time-domain and windowed spectral features share one filtering pass
+    filtered = filter_signal(emg_signal, fs)
+    emg_feats = time_domain_features(filtered)
+    emg_feats.update(spectral_features(filtered, fs))
+    features = {f"{k.lower()}_{muscle}": float(v) for k, v in emg_feats.items()
+                if k not in ("rms_time_corr", "mnf_time_corr")}
+    features[f"fatigue_level_{muscle}"] = float(fatigue_level(
+        features[f"rms_{muscle}"], features[f"mdf_{muscle}"], features[f"mnf_{muscle}"]
+    ))
+    features["rms_time_corr"] = float(emg_feats["rms_time_corr"])
+    features["mnf_time_corr"] = float(emg_feats["mnf_time_corr"])
+    return features
+
 def simulate_emg_and_features(muscle):
     features = {
         f"rms_{muscle}": np.random.uniform(0.5, 1.5),
@@ -56,19 +108,15 @@ def simulate_emg_and_features(muscle):
         f"mdf_{muscle}": np.random.uniform(80, 150),
         f"mnf_{muscle}": np.random.uniform(80, 150),
     }
-    rms = features[f"rms_{muscle}"]
-    mdf = features[f"mdf_{muscle}"]
-    mnf = features[f"mnf_{muscle}"]
-    fatigue_level = 0.5 * ((rms - 0.5) / (2.0 - 0.5)) + \
-                    0.25 * (1 - (mdf - 80) / (150 - 80)) + \
-                    0.25 * (1 - (mnf - 80) / (150 - 80))
-    fatigue_level = float(np.clip(fatigue_level, 0, 1))
-    features[f"fatigue_level_{muscle}"] = fatigue_level
+    features[f"fatigue_level_{muscle}"] = float(fatigue_level(
+        features[f"rms_{muscle}"], features[f"mdf_{muscle}"], features[f"mnf_{muscle}"]
+    ))
     features["rms_time_corr"] = np.random.uniform(-0.5, 1)
     features["mnf_time_corr"] = np.random.uniform(-1, 0.5)
     return features
 
 def main():
+    load_models()
     # ---- Typography Logo and Subheading ----
     st.markdown('<div class="neurisk-logo">Neurisk</div>', unsafe_allow_html=True)
     st.markdown('<div class="neurisk-sub">Muscle Injury Risk Prediction for Basketball Players</div>', unsafe_allow_html=True)
@@ -122,29 +170,20 @@ def main():
                 tcp_ip = st.text_input("ESP32 IP Address", value="192.168.4.1")
                 tcp_port = st.number_input("ESP32 TCP Port", min_value=1, max_value=65535, value=3333)
             capture_duration = st.number_input("Capture Duration (seconds)", min_value=1, max_value=30, value=5)
+            protocol = st.selectbox("Wire Format", ["text", "binary"], help="binary: framed int16 samples, for high sample rates")
             begin_test = st.button("Begin Test")
             if begin_test:
                 with st.spinner("Capturing EMG data..."):
                     try:
                         if capture_mode == "Serial":
-                            data = capture_emg_serial(serial_port, baud_rate, capture_duration)
+                            data = capture_emg_serial(serial_port, baud_rate, capture_duration, protocol)
                         else:
-                            data = capture_emg_tcp(tcp_ip, tcp_port, capture_duration)
+                            data = capture_emg_tcp(tcp_ip, tcp_port, capture_duration, protocol)
                         st.success(f"Captured {len(data)} samples.")
                         pd.DataFrame(data).to_csv("emg_capture.csv", index=False, header=False)
                         emg_signal = np.array(data).flatten()
-                        emg_feats = extract_features(emg_signal, fs=1000)
-                        features = {f"{k}_{muscle_group}": v for k, v in emg_feats.items()}
-                        rms = features.get(f"rms_{muscle_group}", 0)
-                        mdf = features.get(f"mdf_{muscle_group}", 0)
-                        mnf = features.get(f"mnf_{muscle_group}", 0)
-                        fatigue_level = 0.5 * ((rms - 0.5) / (2.0 - 0.5)) + \
-                                        0.25 * (1 - (mdf - 80) / (150 - 80)) + \
-                                        0.25 * (1 - (mnf - 80) / (150 - 80))
-                        fatigue_level = float(np.clip(fatigue_level, 0, 1))
-                        features[f"fatigue_level_{muscle_group}"] = fatigue_level
-                        features["rms_time_corr"] = np.random.uniform(-0.5, 1)
-                        features["mnf_time_corr"] = np.random.uniform(-1, 0.5)
+                        with timed('features'):
+                            features = features_from_signal(emg_signal, muscle_group)
                         st.session_state['features'] = features
                         st.session_state['emg_captured'] = True
                         st.success("EMG features extracted from captured data.")
@@ -158,23 +197,16 @@ def main():
         simulate = st.checkbox("Simulate EMG Features")
         if emg_data_file is not None:
             try:
-                emg_df = pd.read_csv(emg_data_file)
+                data = emg_data_file.getvalue()
+                digest = content_hash(data)
+                with timed('parse'):
+                    emg_df = load_emg_csv(digest, data)
                 if emg_df.shape[1] != 1:
                     st.error("Please upload a CSV with a single column of raw EMG data.")
                 else:
                     emg_signal = emg_df.squeeze().values
-                    emg_feats = extract_features(emg_signal, fs=1000)
-                    features = {f"{k}_{muscle_group}": v for k, v in emg_feats.items()}
-                    rms = features[f"rms_{muscle_group}"]
-                    mdf = features[f"mdf_{muscle_group}"]
-                    mnf = features[f"mnf_{muscle_group}"]
-                    fatigue_level = 0.5 * ((rms - 0.5) / (2.0 - 0.5)) + \
-                                    0.25 * (1 - (mdf - 80) / (150 - 80)) + \
-                                    0.25 * (1 - (mnf - 80) / (150 - 80))
-                    fatigue_level = float(np.clip(fatigue_level, 0, 1))
-                    features[f"fatigue_level_{muscle_group}"] = fatigue_level
-                    features["rms_time_corr"] = np.random.uniform(-0.5, 1)
-                    features["mnf_time_corr"] = np.random.uniform(-1, 0.5)
+                    with timed('features'):
+                        features = cached_features(digest, muscle_group, 1000, emg_signal)
                     st.session_state['features'] = features
                     st.session_state['emg_captured'] = True
                     st.success("EMG features extracted successfully.")
@@ -216,16 +248,16 @@ def main():
                     user_inputs[f"contraction_type_{cat}"] = 1 if contraction_type == cat else 0
                 user_inputs.pop("previous_injury")
                 user_inputs.pop("contraction_type")
-                X_pred = pd.DataFrame([user_inputs])
-                predictor = InjuryRiskPredictor()
-                model = predictor.models[muscle_group]
-                expected_features = list(getattr(model, "feature_names_in_", []))
-                if expected_features:
-                    for col in expected_features:
-                        if col not in X_pred.columns:
-                            X_pred[col] = 0
-                    X_pred = X_pred[expected_features]
-                risk_level = model.predict(X_pred)[0]
+                with timed('predict'):
+                    X_pred = pd.DataFrame([user_inputs])
+                    model = load_models()[muscle_group]
+                    expected_features = list(getattr(model, "feature_names_in_", []))
+                    if expected_features:
+                        for col in expected_features:
+                            if col not in X_pred.columns:
+                                X_pred[col] = 0
+                        X_pred = X_pred[expected_features]
+                    risk_level = model.predict(X_pred)[0]
                 st.success(f"Predicted Injury Risk Level: {risk_level.capitalize()}")
                 st.header("Recommended Training Plan")
                 if risk_level == "low":
@@ -237,6 +269,20 @@ def main():
                 else:
                     st.write("No recommendation available.")
 
+    show_timings()
+
+
+def show_timings():
+    timings = st.session_state.get('timings')
+    if not timings:
+        return
+    with st.expander("Timing"):
+        columns = st.columns(3)
+        for column, name in zip(columns, ('parse', 'features', 'predict')):
+            value = timings.get(name)
+            column.metric(name.capitalize(), f"{value:.1f} ms" if value is not None else "-")
+        st.caption("Last run of each step; cached parses and features show near-zero times.")
+
 def display_training_regime(risk_level):
     if risk_level == "low":
         st.subheader("Low Risk Training Regime")
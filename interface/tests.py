@@ -0,0 +1,162 @@
+"""Tests for the capture-side helpers. Run from the repository root:
+
+    python -m unittest interface.tests
+"""
+import threading
+import unittest
+
+import numpy as np
+
+from .capture_client import RingBuffer, StreamingCapture, retry_after_seconds
+from .emg_capture import FrameParser, LineParser, encode_frame
+from .multi_capture import Node, align_streams
+
+
+def _node(name, samples, fs, start_time):
+    node = Node(name, 'tcp', 'localhost:3333', fs=fs)
+    node.blocks = [np.asarray(samples, dtype=float)]
+    node.samples = len(samples)
+    node.start_time = start_time
+    return node
+
+
+class LineParserTests(unittest.TestCase):
+    def test_lines_split_across_blocks(self):
+        parser = LineParser()
+        np.testing.assert_array_equal(parser.feed(b'12\r\n3'), [12])
+        np.testing.assert_array_equal(parser.feed(b'4\r\n-5.5\n'), [34, -5.5])
+        self.assertEqual(len(parser.feed(b'6')), 0)
+
+    def test_skips_partial_first_line(self):
+        parser = LineParser(skip_partial_first_line=True)
+        np.testing.assert_array_equal(parser.feed(b'34\n56\n78\n'), [56, 78])
+
+    def test_drops_garbled_lines(self):
+        parser = LineParser()
+        np.testing.assert_array_equal(parser.feed(b'1\nx2\n3\n'), [1, 3])
+        self.assertEqual(parser.bad_lines, 1)
+
+
+class FrameParserTests(unittest.TestCase):
+    def test_frames_split_byte_by_byte(self):
+        data = encode_frame([1, 2, 3], 0) + encode_frame([-4, 5], 1)
+        parser = FrameParser()
+        samples = np.concatenate([parser.feed(data[i:i + 1]) for i in range(len(data))])
+        np.testing.assert_array_equal(samples, [1, 2, 3, -4, 5])
+        self.assertEqual((parser.frames, parser.bad_frames, parser.dropped_frames), (2, 0, 0))
+
+    def test_resyncs_after_bad_checksum(self):
+        corrupt = bytearray(encode_frame([1, 2, 3], 0))
+        corrupt[6] ^= 0xFF
+        parser = FrameParser()
+        samples = parser.feed(b'\x00\x13' + bytes(corrupt) + encode_frame([4, 5], 1))
+        np.testing.assert_array_equal(samples, [4, 5])
+        self.assertEqual((parser.frames, parser.bad_frames), (1, 1))
+
+    def test_counts_sequence_gaps(self):
+        parser = FrameParser()
+        for seq in (0, 1, 4, 0xFFFF, 0):
+            parser.feed(encode_frame([seq & 0xFF], seq))
+        # 2 and 3 are missing, then 5..65534; the 65535 -> 0 wrap is not a gap
+        self.assertEqual(parser.dropped_frames, 2 + (0xFFFF - 5))
+        self.assertEqual(parser.frames, 5)
+
+
+class RingBufferTests(unittest.TestCase):
+    def test_wraps_around(self):
+        buffer = RingBuffer(4)
+        buffer.write([1, 2, 3])
+        np.testing.assert_array_equal(buffer.read(1, 2), [1, 2])
+        buffer.write([4, 5, 6])
+        self.assertEqual(len(buffer), 4)
+        np.testing.assert_array_equal(buffer.read(4, 4), [3, 4, 5, 6])
+
+    def test_read_times_out_empty(self):
+        self.assertEqual(len(RingBuffer(4).read(1, 4, timeout=0.01)), 0)
+
+    def test_close_drains_then_returns_none(self):
+        buffer = RingBuffer(4)
+        buffer.write([1])
+        buffer.close()
+        np.testing.assert_array_equal(buffer.read(3, 4), [1])
+        self.assertIsNone(buffer.read(1, 4))
+
+    def test_full_buffer_blocks_the_writer(self):
+        buffer = RingBuffer(4)
+        writer = threading.Thread(target=buffer.write, args=(np.arange(6),))
+        writer.start()
+        first = buffer.read(4, 4, timeout=1)
+        second = buffer.read(2, 4, timeout=1)
+        writer.join(1)
+        self.assertFalse(writer.is_alive())
+        np.testing.assert_array_equal(np.concatenate([first, second]), np.arange(6))
+
+
+class _FakeClient:
+    def __init__(self, next_sequence):
+        self._next_sequence = next_sequence
+        self.uploads = []
+
+    def next_sequence(self, session_id):
+        return self._next_sequence
+
+    def upload_chunk(self, session_id, sequence, samples, fs):
+        self.uploads.append((sequence, list(samples)))
+        return sequence
+
+
+class StreamingCaptureTests(unittest.TestCase):
+    def test_continues_the_sessions_chunk_sequence(self):
+        blocks = [b'1\n2\n3\n4\n5\n']
+
+        def read_into(view):
+            if not blocks:
+                return 0
+            block = blocks.pop()
+            view[:len(block)] = block
+            return len(block)
+
+        client = _FakeClient(next_sequence=5)
+        capture = StreamingCapture(client, 1, read_into, LineParser(), fs=4, chunk_seconds=0.5)
+        self.assertEqual(capture.run(duration=5), 5)
+        sequences = [sequence for sequence, _ in client.uploads]
+        self.assertEqual(sequences, list(range(5, 5 + len(sequences))))
+        self.assertEqual(sum((samples for _, samples in client.uploads), []), [1, 2, 3, 4, 5])
+
+
+class RetryAfterTests(unittest.TestCase):
+    def test_seconds_and_http_date(self):
+        self.assertEqual(retry_after_seconds('3', 0.5), 3.0)
+        self.assertEqual(retry_after_seconds(None, 0.5), 0.5)
+        self.assertEqual(retry_after_seconds('Wed, 21 Oct 2015 07:28:00 GMT', 0.5), 0.0)
+        self.assertEqual(retry_after_seconds('soon', 0.5), 0.5)
+
+
+class AlignStreamsTests(unittest.TestCase):
+    def test_same_rate_cut_to_common_window(self):
+        early = _node('calves', np.arange(10), 4, 0.0)
+        late = _node('hamstrings', np.arange(100, 110), 4, 0.5)
+        data, start, fs = align_streams([early, late])
+        self.assertEqual((start, fs), (0.5, 4))
+        np.testing.assert_array_equal(data, [np.arange(2, 10), np.arange(100, 108)])
+
+    def test_mixed_rates_resampled_to_highest(self):
+        fast = _node('calves', np.arange(8), 4, 0.0)
+        slow = _node('quadriceps', np.arange(4), 2, 0.0)
+        data, _, fs = align_streams([fast, slow])
+        self.assertEqual(fs, 4)
+        np.testing.assert_array_equal(data[0], np.arange(8))
+        # Linear between the slow node's samples, held after its last one
+        np.testing.assert_allclose(data[1], [0, 0.5, 1, 1.5, 2, 2.5, 3, 3])
+
+    def test_silent_nodes_are_ignored(self):
+        silent = Node('quadriceps', 'tcp', 'localhost:3333')
+        data, start, _ = align_streams([silent])
+        self.assertEqual(data.shape, (0, 0))
+        self.assertIsNone(start)
+        data, _, _ = align_streams([silent, _node('calves', np.arange(4), 4, 0.0)])
+        self.assertEqual(data.shape, (1, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()